@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from transport import Transport
+
+# asyncio runtime ====================================================
+# same transport core, but driven by the event loop instead of a
+# blocking select: acks arrive through a DatagramProtocol, retransmit
+# and pacing wakeups are loop timers. nothing blocks, so any number of
+# transfers can share one process without a slow flow stalling the rest.
+# packets on the wire are unchanged, receiver.py sees a normal sender.
+
+
+class SenderProtocol(asyncio.DatagramProtocol):
+    def __init__(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.on_datagram(data)
+
+    # port unreachable and friends, the retransmit timer covers it
+    def error_received(self, exc):
+        self.transport.log(f"Socket error: {exc}")
+
+
+class AsyncTransport(Transport):
+    def __init__(self, controller, **options):
+        super().__init__(controller, gso=False, **options)
+        self.loop = None
+        self.endpoint = None
+        self.pending = []  # acks received since the last step
+        self.timer = None
+        self.finished = None
+
+    def send_datagram(self, data):
+        self.endpoint.sendto(data)
+        self.sends += 1
+
+    # the event loop's endpoint has no sendmsg, the one join happens here
+    def send_parts(self, header, payload):
+        self.endpoint.sendto(header + payload)
+        self.sends += 1
+
+    # acks that land in the same loop iteration are handled as one batch
+    def on_datagram(self, data):
+        self.pending.append(data)
+        if len(self.pending) == 1:
+            self.loop.call_soon(self.step)
+
+    # runs from loop callbacks, an error has to reach run_async through
+    # the future or its await never returns
+    def step(self):
+        if self.finished.done():
+            return
+
+        try:
+            acks, self.pending = self.pending, []
+            if acks:
+                self.count_batch(len(acks))
+                self.handle_acks(acks, time.time())
+            self.handle_timeouts(time.time())
+
+            if self.done:
+                if self.timer is not None:
+                    self.timer.cancel()
+                self.finished.set_result(self.finish(time.time()))
+                return
+
+            self.send_window(time.time())
+
+            # wake again for the next retransmit or pacer token
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = self.loop.call_later(self.wait_time(time.time()), self.step)
+        except Exception as exc:
+            self.finished.set_exception(exc)
+
+    async def run_async(self):
+        self.loop = asyncio.get_running_loop()
+        self.finished = self.loop.create_future()
+        self.endpoint, _ = await self.loop.create_datagram_endpoint(
+            lambda: SenderProtocol(self), remote_addr=self.address
+        )
+        try:
+            self.start(time.time())
+            self.step()
+            return await self.finished
+        finally:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.endpoint.close()
+
+
+# run transfers side by side, returns their stats in the same order
+async def run_transfers(transports):
+    return await asyncio.gather(*(transport.run_async() for transport in transports))
@@ -0,0 +1,246 @@
+import argparse
+import csv
+import filecmp
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from impairment import ACKS, BOTH, ImpairmentProxy, Schedule
+from transport import TUNABLE_PREFIX
+
+# benchmark matrix ===================================================
+# every sender x file size x network profile x seed, each run against a
+# fresh receiver.py, optionally behind impairment.py. the sender writes
+# its stats with --stats-json, the received file is compared byte for
+# byte, and the runs are summarized per (sender, size, profile) with a
+# 95% confidence interval. --baseline compares the metric against an
+# earlier --json result and exits 1 on a regression or a bad file.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SENDERS = {
+    "stop-and-wait": "sender_stop_and_wait.py",
+    "fixed": "sender_fixed_sliding_window.py",
+    "tahoe": "sender_tahoe.py",
+    "reno": "sender_reno.py",
+    "t": "t.py",
+    "r": "r.py",
+    "custom": "proj3_Deyu_918156143_Cory_919239797_sender_custom.py",
+    "cubic": "sender_cubic.py",
+    "bbr": "sender_bbr.py",
+}
+
+# None runs straight over loopback, otherwise impairment.py settings
+PROFILES = {
+    "loopback": None,
+    "lossy": {"direction": BOTH, "fixed": True, "rate": 50_000_000, "loss": 5, "delay": 0.02},
+    "training": {"direction": ACKS},
+}
+
+FIELDS = ("time", "throughput", "avgDelay", "avgJitter", "retransmissions", "metric")
+DEFAULT_SIZES = "100000,1000000"
+DEFAULT_PROFILES = "loopback,lossy"
+BASE_PORT = 5001
+RUN_TIMEOUT = 300
+TOLERANCE = 0.1
+
+# two sided 95% t values by degrees of freedom, normal beyond the table
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086]
+
+
+def confidence_interval(values):
+    n = len(values)
+    if n == 0:
+        return 0, 0, 0
+    mean = sum(values) / n
+    if n == 1:
+        return mean, 0, 0
+    stddev = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    t = T_95[n - 2] if n - 2 < len(T_95) else 1.96
+    return mean, stddev, t * stddev / math.sqrt(n)
+
+
+def make_file(path, size, seed):
+    with open(path, "wb") as f:
+        f.write(random.Random(seed).randbytes(size))
+
+
+def make_proxy(settings, port, seed):
+    schedule = Schedule(seed, settings.get("rate", 100000), settings.get("loss", 0), enabled=not settings.get("fixed", False))
+    linkOptions = {key: settings[key] for key in ("delay", "reorder", "reorderCorrelation", "limit") if key in settings}
+    return ImpairmentProxy(port, ("127.0.0.1", port + 1), seed, settings.get("direction", ACKS), schedule, **linkOptions)
+
+
+# overrides are sender constants (see transport.tunable), for tune.py
+def run_once(sender, size, profile, seed, args, workdir, overrides=None):
+    sent = os.path.join(workdir, f"send-{size}-{seed}.bin")
+    if not os.path.exists(sent):
+        make_file(sent, size, seed)
+    received = os.path.join(workdir, "received.bin")
+    statsPath = os.path.join(workdir, "stats.json")
+    for path in (received, statsPath):
+        if os.path.exists(path):
+            os.remove(path)
+
+    settings = PROFILES[profile]
+    receiverPort = args.port + 1 if settings is not None else args.port
+    row = {"sender": sender, "size": size, "profile": profile, "seed": seed, "ok": False, "verified": False, "error": ""}
+
+    receiver = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "receiver.py"), "--port", str(receiverPort), "--output", received],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    proxy = thread = None
+    try:
+        if settings is not None:
+            proxy = make_proxy(settings, args.port, seed)
+            thread = threading.Thread(target=proxy.run, daemon=True)
+            thread.start()
+        time.sleep(0.3)
+
+        try:
+            result = subprocess.run(
+                [sys.executable, os.path.join(HERE, SENDERS[sender]), "--file", sent, "--port", str(args.port), "--stats-json", statsPath],
+                cwd=workdir,
+                env=dict(os.environ, **{TUNABLE_PREFIX + name: json.dumps(value) for name, value in (overrides or {}).items()}),
+                capture_output=True,
+                text=True,
+                timeout=args.timeout,
+            )
+            if result.returncode != 0:
+                row["error"] = f"sender exit {result.returncode}: {result.stderr.strip()[-200:]}"
+        except subprocess.TimeoutExpired:
+            row["error"] = f"timeout after {args.timeout}s"
+
+        # the receiver exits on FINACK, a lost FINACK is covered by SIGTERM
+        try:
+            receiver.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            receiver.terminate()
+            receiver.wait()
+    finally:
+        if receiver.poll() is None:
+            receiver.kill()
+            receiver.wait()
+        if proxy is not None:
+            proxy.stop()
+            thread.join()
+
+    if os.path.exists(statsPath):
+        with open(statsPath) as f:
+            stats = json.load(f)
+        row.update({field: stats[field] for field in FIELDS})
+        row["ok"] = not row["error"]
+    row["verified"] = os.path.exists(received) and filecmp.cmp(sent, received, shallow=False)
+    if row["ok"] and not row["verified"]:
+        row["error"] = "received file differs"
+    return row
+
+
+def summarize(runs):
+    groups = {}
+    for row in runs:
+        groups.setdefault((row["sender"], row["size"], row["profile"]), []).append(row)
+
+    summary = []
+    for (sender, size, profile), rows in groups.items():
+        good = [row for row in rows if row["ok"] and row["verified"]]
+        entry = {"sender": sender, "size": size, "profile": profile, "runs": len(rows), "passed": len(good)}
+        for field in FIELDS:
+            mean, stddev, ci = confidence_interval([row[field] for row in good])
+            entry[field] = {"mean": mean, "stddev": stddev, "ci95": ci}
+        summary.append(entry)
+    return summary
+
+
+# groups whose mean metric fell more than tolerance below the baseline
+def regressions(summary, baseline, tolerance):
+    previous = {(entry["sender"], entry["size"], entry["profile"]): entry for entry in baseline["summary"]}
+    found = []
+    for entry in summary:
+        old = previous.get((entry["sender"], entry["size"], entry["profile"]))
+        if old is None:
+            continue
+        now, before = entry["metric"]["mean"], old["metric"]["mean"]
+        if entry["passed"] < entry["runs"] or now < before * (1 - tolerance):
+            found.append((entry, before))
+    return found
+
+
+def print_summary(summary):
+    print(f"\n{'sender':<14}{'size':>10}  {'profile':<10}{'pass':>6}{'time (s)':>22}{'throughput (B/s)':>28}{'metric':>26}")
+    for entry in summary:
+        time_, throughput, metric = (entry[field] for field in ("time", "throughput", "metric"))
+        print(f"{entry['sender']:<14}{entry['size']:>10}  {entry['profile']:<10}{entry['passed']:>3}/{entry['runs']:<2}"
+              f"{time_['mean']:>12.3f} ±{time_['ci95']:<8.3f}"
+              f"{throughput['mean']:>16.0f} ±{throughput['ci95']:<10.0f}"
+              f"{metric['mean']:>14.3f} ±{metric['ci95']:<10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--senders", default=",".join(SENDERS), help="comma separated, from: " + ", ".join(SENDERS))
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated file sizes in bytes")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILES, help="comma separated, from: " + ", ".join(PROFILES))
+    parser.add_argument("--seeds", type=int, default=3, help="runs per cell, seeds 1..N")
+    parser.add_argument("--port", type=int, default=BASE_PORT, help="senders use this port, the receiver the next one behind a proxy")
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT, help="seconds before a sender run is abandoned")
+    parser.add_argument("--json", help="write runs and summary here")
+    parser.add_argument("--csv", help="write one row per run here")
+    parser.add_argument("--baseline", help="earlier --json output to compare the metric against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative metric drop against the baseline")
+    args = parser.parse_args()
+
+    senders = args.senders.split(",")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    profiles = args.profiles.split(",")
+    for name in senders:
+        if name not in SENDERS:
+            parser.error(f"unknown sender {name}")
+    for name in profiles:
+        if name not in PROFILES:
+            parser.error(f"unknown profile {name}")
+
+    runs = []
+    total = len(senders) * len(sizes) * len(profiles) * args.seeds
+    with tempfile.TemporaryDirectory() as workdir:
+        for profile in profiles:
+            for size in sizes:
+                for sender in senders:
+                    for seed in range(1, args.seeds + 1):
+                        row = run_once(sender, size, profile, seed, args, workdir)
+                        runs.append(row)
+                        status = "ok" if row["ok"] and row["verified"] else f"FAILED {row['error']}"
+                        print(f"[{len(runs)}/{total}] {sender} {size} {profile} seed {seed}: "
+                              f"metric {row.get('metric', 0):.3f}, time {row.get('time', 0):.2f}s {status}")
+
+    summary = summarize(runs)
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "summary": summary}, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["sender", "size", "profile", "seed", "ok", "verified", *FIELDS, "error"])
+            writer.writeheader()
+            for row in runs:
+                writer.writerow({key: row.get(key, "") for key in writer.fieldnames})
+
+    failed = [row for row in runs if not (row["ok"] and row["verified"])]
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for entry, before in regressions(summary, baseline, args.tolerance):
+            print(f"REGRESSION {entry['sender']} {entry['size']} {entry['profile']}: "
+                  f"metric {entry['metric']['mean']:.3f} vs baseline {before:.3f}, {entry['passed']}/{entry['runs']} passed")
+            failed.append(entry)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,59 @@
+import os
+import struct
+
+from ranges import RangeSet
+
+# received range checkpoints =========================================
+# a resumable flow keeps its received byte ranges next to the partial
+# output file, so a restarted receiver or sender picks up where the
+# last run stopped:
+#
+#   [b'RNG1'][file size 8][file id 8][range count 4][start 8][end 8]...
+#
+# the output file is flushed before the ranges are written, so a
+# checkpoint never claims bytes the file does not hold, and the new
+# checkpoint replaces the old one in a single rename.
+
+MAGIC = b"RNG1"
+HEADER = struct.Struct(">4sq8sI")
+RANGE = struct.Struct(">qq")
+SUFFIX = ".ranges"
+
+
+def checkpoint_path(output):
+    return output + SUFFIX
+
+
+def save(path, size, fileId, ranges):
+    ranges = list(ranges)
+    data = HEADER.pack(MAGIC, size, fileId, len(ranges)) + b"".join(RANGE.pack(start, end) for start, end in ranges)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+# (file size, file id, RangeSet), None when missing or unreadable
+def load(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, size, fileId, count = HEADER.unpack_from(data)
+    if magic != MAGIC or len(data) != HEADER.size + count * RANGE.size:
+        return None
+
+    ranges = RangeSet()
+    for i in range(count):
+        ranges.add(*RANGE.unpack_from(data, HEADER.size + i * RANGE.size))
+    return size, fileId, ranges
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
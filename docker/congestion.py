@@ -0,0 +1,367 @@
+# congestion controllers =============================================
+# the transport core owns the socket, timers and bookkeeping, a
+# controller only decides how big the window is (and how fast to pace).
+#
+#   cwnd                  packets allowed in flight
+#   pacing_rate           packets per second, None to send as fast as cwnd allows
+#   on_ack(acked, rttSample, now)   new data delivered (cumulative or sack)
+#   on_dupack(count, now)           duplicate cumulative ack, True = fast retransmit
+#   on_timeout(now)                 oldest packet's timer ran out
+#   on_delivery(delivered, priorDelivered, deliveryRate, rttSample, inflight, now)
+#       any ack that delivered data, with the delivery rate measured since
+#       the newest covered packet was sent; for model based controllers
+#
+# window growth follows the original scripts: double per acked packet in
+# slow start, +1 per acked packet in avoidance, capped at maxWindow.
+# counting packets rather than acks keeps it the same when acks batch up.
+
+
+class CongestionController:
+    name = "base"
+
+    def __init__(self, cwnd=1):
+        self.cwnd = cwnd
+        self.pacing_rate = None
+
+    def on_ack(self, acked, rttSample, now):
+        pass
+
+    def on_dupack(self, count, now):
+        return False
+
+    def on_timeout(self, now):
+        pass
+
+    def on_delivery(self, delivered, priorDelivered, deliveryRate, rttSample, inflight, now):
+        pass
+
+    def state(self):
+        return {"cwnd": self.cwnd}
+
+
+# fixed window, stop and wait is just a window of 1
+class FixedWindow(CongestionController):
+    name = "fixed"
+
+    def __init__(self, windowSize):
+        super().__init__(windowSize)
+
+
+class Tahoe(CongestionController):
+    name = "tahoe"
+
+    def __init__(self, initialCwnd=1, ssthresh=64, maxWindow=None):
+        super().__init__(initialCwnd)
+        self.ssthresh = ssthresh
+        self.maxWindow = maxWindow
+
+    def _cap(self, cwnd):
+        return cwnd if self.maxWindow is None else min(cwnd, self.maxWindow)
+
+    def on_ack(self, acked, rttSample, now):
+        acked = max(acked, 1)
+        while acked and self.cwnd < self.ssthresh:  # Slow Start
+            self.cwnd = self._cap(self.cwnd * 2)
+            acked -= 1
+            if self.maxWindow is not None and self.cwnd >= self.maxWindow:
+                return
+        # Congestion Avoidance
+        self.cwnd = self._cap(self.cwnd + acked)
+
+    def on_dupack(self, count, now):
+        if count == 3:
+            self.ssthresh = max(self.cwnd // 2, 2)
+            self.cwnd = 1
+            return True
+        return False
+
+    def on_timeout(self, now):
+        self.ssthresh = max(self.cwnd // 2, 2)
+        self.cwnd = 1
+
+    def state(self):
+        return {"cwnd": self.cwnd, "ssthresh": self.ssthresh}
+
+
+class Reno(Tahoe):
+    name = "reno"
+
+    def __init__(self, initialCwnd=1, ssthresh=64, maxWindow=None):
+        super().__init__(initialCwnd, ssthresh, maxWindow)
+        self.inFastRecovery = False
+
+    def on_ack(self, acked, rttSample, now):
+        if self.inFastRecovery:  # Exit Fast Recovery
+            self.cwnd = self.ssthresh
+            self.inFastRecovery = False
+        else:
+            super().on_ack(acked, rttSample, now)
+
+    def on_dupack(self, count, now):
+        if count == 3 and not self.inFastRecovery:  # Enter Fast Recovery
+            self.ssthresh = max(self.cwnd // 2, 2)
+            self.cwnd = self.ssthresh + 3
+            self.inFastRecovery = True
+            return True
+        if count > 3 and self.inFastRecovery:  # inflate window
+            self.cwnd = self._cap(self.cwnd + 1)
+        return False
+
+    def on_timeout(self, now):
+        self.inFastRecovery = False
+        super().on_timeout(now)
+
+
+# CUBIC (RFC 8312) ===================================================
+# window is a cubic function of time since the last loss, so it jumps
+# back toward the old maximum quickly after the bandwidth swings in
+# training_profile.sh instead of probing +1 per ack like Reno.
+CUBIC_C = 0.4
+CUBIC_BETA = 0.7
+
+
+class Cubic(CongestionController):
+    name = "cubic"
+
+    def __init__(self, initialCwnd=1, ssthresh=64, maxWindow=None, fastConvergence=True):
+        super().__init__(initialCwnd)
+        self.ssthresh = ssthresh
+        self.maxWindow = maxWindow
+        self.fastConvergence = fastConvergence
+        self.inFastRecovery = False
+
+        self.wMax = 0.0  # window right before the last reduction
+        self.wLastMax = 0.0  # previous wMax, for fast convergence
+        self.k = 0.0  # seconds from epoch start until the curve reaches wMax
+        self.epochStart = None
+        self.wEst = 0.0  # Reno-equivalent window for the TCP-friendly region
+        self.rtt = 0.1  # latest rtt sample, path is ~100ms
+
+    def _cap(self, cwnd):
+        return cwnd if self.maxWindow is None else min(cwnd, self.maxWindow)
+
+    def _reduce(self):
+        # fast convergence, give up bandwidth to newer flows still growing
+        if self.fastConvergence and self.cwnd < self.wLastMax:
+            self.wLastMax = self.cwnd
+            self.wMax = self.cwnd * (1 + CUBIC_BETA) / 2
+        else:
+            self.wLastMax = self.cwnd
+            self.wMax = self.cwnd
+        self.epochStart = None
+        self.ssthresh = max(self.cwnd * CUBIC_BETA, 2)
+
+    def on_ack(self, acked, rttSample, now):
+        if rttSample is not None:
+            self.rtt = rttSample
+
+        if self.inFastRecovery:  # Exit Fast Recovery
+            self.inFastRecovery = False
+            return
+
+        if self.cwnd < self.ssthresh:  # Slow Start
+            self.cwnd = self._cap(self.cwnd + acked)
+            return
+
+        # Congestion Avoidance, start a new epoch after each reduction
+        if self.epochStart is None:
+            self.epochStart = now
+            if self.cwnd < self.wMax:
+                self.k = ((self.wMax - self.cwnd) / CUBIC_C) ** (1 / 3)
+            else:
+                self.k = 0.0
+                self.wMax = self.cwnd
+            self.wEst = self.cwnd
+
+        t = now - self.epochStart
+        target = CUBIC_C * (t + self.rtt - self.k) ** 3 + self.wMax
+
+        # TCP-friendly region, never grow slower than Reno would
+        self.wEst += 3 * (1 - CUBIC_BETA) / (1 + CUBIC_BETA) * acked / self.cwnd
+        target = max(target, self.wEst)
+
+        if target > self.cwnd:
+            self.cwnd += (target - self.cwnd) / self.cwnd * acked
+        else:
+            self.cwnd += 0.01 * acked / self.cwnd
+        self.cwnd = self._cap(self.cwnd)
+
+    def on_dupack(self, count, now):
+        if count == 3 and not self.inFastRecovery:  # Enter Fast Recovery
+            self._reduce()
+            self.cwnd = self.ssthresh
+            self.inFastRecovery = True
+            return True
+        return False
+
+    def on_timeout(self, now):
+        self.inFastRecovery = False
+        self._reduce()
+        self.cwnd = 1
+
+    def state(self):
+        return {"cwnd": self.cwnd, "ssthresh": self.ssthresh, "wMax": self.wMax}
+
+
+# BBR (model based, v1 style) ========================================
+# instead of reacting to loss, keep a model of the path: windowed max
+# delivery rate (bottleneck bandwidth) and windowed min rtt. pace at the
+# bandwidth estimate and keep about one bandwidth-delay product in
+# flight, so the 1000 packet netem queue stays near empty and delay low.
+BBR_HIGH_GAIN = 2.885  # 2/ln(2), doubles the rate every round in startup
+BBR_PROBE_GAINS = [1.25, 0.75, 1, 1, 1, 1, 1, 1]
+BBR_BW_WINDOW = 10  # rounds kept in the max bandwidth filter
+BBR_MIN_RTT_WINDOW = 10.0  # seconds before min rtt must be refreshed
+BBR_PROBE_RTT_TIME = 0.2
+BBR_MIN_CWND = 4
+
+STARTUP = "startup"
+DRAIN = "drain"
+PROBE_BW = "probe_bw"
+PROBE_RTT = "probe_rtt"
+
+
+class Bbr(CongestionController):
+    name = "bbr"
+
+    def __init__(self, initialCwnd=10, initialRtt=0.1, maxWindow=None):
+        super().__init__(initialCwnd)
+        self.maxWindow = maxWindow
+        self.mode = STARTUP
+        self.pacingGain = BBR_HIGH_GAIN
+        self.cwndGain = BBR_HIGH_GAIN
+
+        # path model
+        self.bwSamples = []  # [round, packets per second], one per round
+        self.maxBw = 0.0
+        self.minRtt = None
+        self.minRttStamp = 0.0
+
+        # round trip counting by delivered packets
+        self.round = 0
+        self.nextRoundDelivered = 0
+        self.roundStart = False
+
+        # startup exit, bandwidth stopped growing 25% for 3 rounds
+        self.fullBw = 0.0
+        self.fullBwRounds = 0
+        self.filledPipe = False
+
+        self.cycleIndex = 0
+        self.cycleStamp = 0.0
+        self.probeRttDone = None
+
+        self.pacing_rate = initialCwnd / initialRtt * BBR_HIGH_GAIN
+
+    def _cap(self, cwnd):
+        return cwnd if self.maxWindow is None else min(cwnd, self.maxWindow)
+
+    # packets the path holds at the estimated bandwidth and min rtt
+    def bdp(self):
+        if self.minRtt is None or self.maxBw == 0:
+            return self.cwnd
+        return self.maxBw * self.minRtt
+
+    def _update_bw(self, deliveryRate):
+        if self.bwSamples and self.bwSamples[-1][0] == self.round:
+            self.bwSamples[-1][1] = max(self.bwSamples[-1][1], deliveryRate)
+        else:
+            self.bwSamples.append([self.round, deliveryRate])
+        while self.bwSamples[0][0] <= self.round - BBR_BW_WINDOW:
+            self.bwSamples.pop(0)
+        self.maxBw = max(sample[1] for sample in self.bwSamples)
+
+    def _check_full_pipe(self):
+        if self.filledPipe or not self.roundStart:
+            return
+        if self.maxBw >= self.fullBw * 1.25:
+            self.fullBw = self.maxBw
+            self.fullBwRounds = 0
+            return
+        self.fullBwRounds += 1
+        if self.fullBwRounds >= 3:
+            self.filledPipe = True
+
+    def _enter_probe_bw(self, now):
+        self.mode = PROBE_BW
+        self.cwndGain = 1
+        # start anywhere but the drain phase
+        self.cycleIndex = self.round % len(BBR_PROBE_GAINS)
+        if self.cycleIndex == 1:
+            self.cycleIndex = 2
+        self.cycleStamp = now
+        self.pacingGain = BBR_PROBE_GAINS[self.cycleIndex]
+
+    def on_delivery(self, delivered, priorDelivered, deliveryRate, rttSample, inflight, now):
+        # a round ends once a packet sent after the round began is delivered
+        self.roundStart = False
+        if priorDelivered >= self.nextRoundDelivered:
+            self.nextRoundDelivered = delivered
+            self.round += 1
+            self.roundStart = True
+
+        self._update_bw(deliveryRate)
+
+        minRttExpired = now - self.minRttStamp > BBR_MIN_RTT_WINDOW
+        if rttSample is not None and (self.minRtt is None or rttSample <= self.minRtt or minRttExpired):
+            self.minRtt = rttSample
+            self.minRttStamp = now
+
+        # state machine
+        self._check_full_pipe()
+        if self.mode == STARTUP and self.filledPipe:
+            self.mode = DRAIN
+            self.pacingGain = 1 / BBR_HIGH_GAIN
+            self.cwndGain = BBR_HIGH_GAIN
+        if self.mode == DRAIN and inflight <= self.bdp():
+            self._enter_probe_bw(now)
+
+        if self.mode == PROBE_BW and self.minRtt is not None:
+            # move to the next gain after one min rtt, stay in the
+            # probe phase until inflight actually reached the higher target
+            gain = BBR_PROBE_GAINS[self.cycleIndex]
+            elapsed = now - self.cycleStamp > self.minRtt
+            if elapsed and (gain <= 1 or inflight >= gain * self.bdp()):
+                self.cycleIndex = (self.cycleIndex + 1) % len(BBR_PROBE_GAINS)
+                self.cycleStamp = now
+                self.pacingGain = BBR_PROBE_GAINS[self.cycleIndex]
+            elif gain < 1 and inflight <= self.bdp():
+                self.cycleIndex = (self.cycleIndex + 1) % len(BBR_PROBE_GAINS)
+                self.cycleStamp = now
+                self.pacingGain = BBR_PROBE_GAINS[self.cycleIndex]
+
+        # min rtt went stale, drain the queue briefly to measure it again
+        if self.mode != PROBE_RTT and minRttExpired and self.minRtt is not None:
+            self.mode = PROBE_RTT
+            self.pacingGain = 1
+            self.probeRttDone = None
+        if self.mode == PROBE_RTT:
+            if self.probeRttDone is None and inflight <= BBR_MIN_CWND:
+                self.probeRttDone = now + BBR_PROBE_RTT_TIME
+            elif self.probeRttDone is not None and now >= self.probeRttDone:
+                self.minRttStamp = now
+                if self.filledPipe:
+                    self._enter_probe_bw(now)
+                else:
+                    self.mode = STARTUP
+                    self.pacingGain = BBR_HIGH_GAIN
+                    self.cwndGain = BBR_HIGH_GAIN
+
+        # pace at the bandwidth estimate, cap inflight at about one bdp
+        if self.maxBw > 0:
+            self.pacing_rate = self.pacingGain * self.maxBw
+        if self.mode == PROBE_RTT:
+            self.cwnd = BBR_MIN_CWND
+        elif self.minRtt is not None and self.maxBw > 0:
+            gain = max(self.cwndGain, self.pacingGain)
+            self.cwnd = self._cap(max(gain * self.bdp() + 2, BBR_MIN_CWND))
+
+    # loss does not shrink the model, but holes still get fast retransmit
+    def on_dupack(self, count, now):
+        return count == 3
+
+    def on_timeout(self, now):
+        self.cwnd = BBR_MIN_CWND
+
+    def state(self):
+        return {"cwnd": self.cwnd, "mode": self.mode, "maxBw": self.maxBw, "minRtt": self.minRtt}
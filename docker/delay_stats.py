@@ -0,0 +1,82 @@
+import math
+
+# streaming delay statistics =========================================
+# the metric only needs the mean delay and the mean jitter, which can
+# be kept as running sums; nothing grows with the transfer. Welford's
+# update gives the variance without catastrophic cancellation, and a
+# log bucketed histogram (HDR style, fixed relative error) answers
+# p50/p95/p99 from a fixed number of counters.
+
+MIN_DELAY = 1e-6  # 1us, anything smaller lands in the first bucket
+MAX_DELAY = 100.0  # anything larger lands in the last bucket
+PRECISION = 0.01  # bucket width relative to its value
+
+
+class LogHistogram:
+    def __init__(self, low=MIN_DELAY, high=MAX_DELAY, precision=PRECISION):
+        self.low = low
+        self.growth = math.log1p(precision)
+        self.counts = [0] * (int(math.log(high / low) / self.growth) + 2)
+        self.total = 0
+
+    def add(self, value):
+        if value <= self.low:
+            bucket = 0
+        else:
+            bucket = min(int(math.log(value / self.low) / self.growth) + 1, len(self.counts) - 1)
+        self.counts[bucket] += 1
+        self.total += 1
+
+    # value at quantile q (0..1), middle of the bucket it falls in
+    def quantile(self, q):
+        if self.total == 0:
+            return 0
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if bucket == 0:
+                    return self.low
+                return self.low * math.exp((bucket - 0.5) * self.growth)
+        return self.low * math.exp((len(self.counts) - 1) * self.growth)
+
+
+class DelayStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared distances from the mean
+        self.min = None
+        self.max = None
+
+        # jitter, mean absolute difference of consecutive delays
+        self.lastDelay = None
+        self.jitterTotal = 0.0
+
+        self.histogram = LogHistogram()
+
+    def add(self, delay):
+        self.count += 1
+        diff = delay - self.mean
+        self.mean += diff / self.count
+        self.m2 += diff * (delay - self.mean)
+        self.min = delay if self.min is None else min(self.min, delay)
+        self.max = delay if self.max is None else max(self.max, delay)
+
+        if self.lastDelay is not None:
+            self.jitterTotal += abs(delay - self.lastDelay)
+        self.lastDelay = delay
+
+        self.histogram.add(delay)
+
+    @property
+    def jitter(self):
+        return self.jitterTotal / (self.count - 1) if self.count > 1 else 0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0
+
+    def percentile(self, p):
+        return self.histogram.quantile(p / 100)
@@ -0,0 +1,232 @@
+import math
+import struct
+
+# forward error correction ===========================================
+# every block of k consecutive data packets is followed by m parity
+# packets, the receiver rebuilds up to m missing payloads of a block
+# from whatever parity arrived, without waiting a round trip.
+#
+# parity: [seq id -2][block start offset 4][k 1][m 1][j 1][last length 2][parity]
+# wide senders (protocol.py version 2) use seq id -7 and an 8 byte start
+#
+# parity j = sum over i of c(j, i) * data i in GF(256), data padded to
+# the block's stride. one parity is plain xor (c = 1), more use a Cauchy
+# matrix, any m x m piece of which is invertible (Reed-Solomon style
+# MDS: any k of the k + m packets rebuild the block). multiplying a
+# whole payload by a constant is one bytes.translate through a 256 byte
+# table and xor runs on python ints, so nothing loops per byte in python.
+
+PARITY_SEQ_ID = -2
+PARITY_HEADER = struct.Struct(">iiBBBH")
+PARITY_OVERHEAD = PARITY_HEADER.size - 4  # bytes a parity datagram adds over a data one
+WIDE_PARITY_SEQ_ID = -7
+WIDE_PARITY_HEADER = struct.Struct(">iqBBBH")  # same overhead over a wide data header
+WIDE_PARITY_MARK = struct.pack(">i", WIDE_PARITY_SEQ_ID)
+
+FEC_BLOCK = 8
+FEC_MIN_PARITY = 1
+FEC_MAX_PARITY = 4
+FEC_MAX_BLOCK = 256 - FEC_MAX_PARITY  # k + m Cauchy points in GF(256), k in one byte
+FEC_MARGIN = 1.5  # parity per expected loss in a block
+LOSS_GAIN = 1 / 64  # ewma weight of each scanned packet, a few blocks of memory
+
+# GF(256) with the usual 0x11d polynomial
+EXP = [0] * 512
+LOG = [0] * 256
+value = 1
+for power in range(255):
+    EXP[power] = value
+    LOG[value] = power
+    value <<= 1
+    if value & 0x100:
+        value ^= 0x11D
+for power in range(255, 512):
+    EXP[power] = EXP[power - 255]
+del value, power
+
+
+def gf_mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return EXP[LOG[a] + LOG[b]]
+
+
+def gf_inv(a):
+    return EXP[255 - LOG[a]]
+
+
+# translate tables, MUL_TABLES[c][x] = c * x
+MUL_TABLES = [bytes(gf_mul(c, x) for x in range(256)) for c in range(256)]
+
+
+def coefficient(j, i, k, m):
+    if m == 1:
+        return 1
+    # x_j = k + j and y_i = i are all distinct, so x_j ^ y_i is never 0
+    return gf_inv((k + j) ^ i)
+
+
+def scale(data, c):
+    return data if c == 1 else data.translate(MUL_TABLES[c])
+
+
+def encode(payloads, m):
+    stride = len(payloads[0])
+    k = len(payloads)
+    padded = [bytes(payload).ljust(stride, b"\0") for payload in payloads]
+    parity = []
+    for j in range(m):
+        acc = 0
+        for i, data in enumerate(padded):
+            acc ^= int.from_bytes(scale(data, coefficient(j, i, k, m)), "big")
+        parity.append(acc.to_bytes(stride, "big"))
+    return parity
+
+
+def invert(matrix):
+    size = len(matrix)
+    rows = [row[:] + [1 if r == c else 0 for c in range(size)] for r, row in enumerate(matrix)]
+    for col in range(size):
+        pivot = next(r for r in range(col, size) if rows[r][col])
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        inv = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(inv, x) for x in rows[col]]
+        for r in range(size):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [x ^ gf_mul(factor, y) for x, y in zip(rows[r], rows[col])]
+    return [row[size:] for row in rows]
+
+
+# rebuild the missing payloads of a block
+# known: {i: payload}, parity: {j: payload}, returns {i: padded payload}
+def decode(known, parity, k, m, stride):
+    missing = [i for i in range(k) if i not in known]
+    if not missing or len(missing) > len(parity):
+        return {}
+    rows = sorted(parity)[: len(missing)]
+
+    # parity minus what the known payloads put into it
+    syndromes = []
+    for j in rows:
+        acc = int.from_bytes(parity[j], "big")
+        for i, data in known.items():
+            acc ^= int.from_bytes(scale(bytes(data).ljust(stride, b"\0"), coefficient(j, i, k, m)), "big")
+        syndromes.append(acc.to_bytes(stride, "big"))
+
+    inverse = invert([[coefficient(j, i, k, m) for i in missing] for j in rows])
+    rebuilt = {}
+    for c, i in enumerate(missing):
+        acc = 0
+        for r, syndrome in enumerate(syndromes):
+            if inverse[c][r]:
+                acc ^= int.from_bytes(scale(syndrome, inverse[c][r]), "big")
+        rebuilt[i] = acc.to_bytes(stride, "big")
+    return rebuilt
+
+
+def pack_parity(start, k, m, j, lastLength, payload, wide=False):
+    if wide:
+        return WIDE_PARITY_HEADER.pack(WIDE_PARITY_SEQ_ID, start, k, m, j, lastLength) + payload
+    return PARITY_HEADER.pack(PARITY_SEQ_ID, start, k, m, j, lastLength) + payload
+
+
+# the rest of either header after the seq id, and the parity
+def unpack_parity(packet):
+    header = WIDE_PARITY_HEADER if packet[:4] == WIDE_PARITY_MARK else PARITY_HEADER
+    _, start, k, m, j, lastLength = header.unpack_from(packet)
+    return start, k, m, j, lastLength, packet[header.size :]
+
+
+# sender side --------------------------------------------------------
+# collects newly sent packets into blocks and sizes the parity from the
+# loss the receiver's sack holes show, so clean paths pay almost nothing
+class FecEncoder:
+    def __init__(self, blockSize=FEC_BLOCK, messageSize=None, minParity=FEC_MIN_PARITY, maxParity=FEC_MAX_PARITY, wide=False):
+        self.blockSize = blockSize
+        self.messageSize = messageSize
+        self.wide = wide
+        self.minParity = minParity
+        self.maxParity = maxParity
+        self.lossRate = 0.0
+        self.block = []  # (index, payload) waiting for the block to fill
+        self.paritySent = 0
+
+    # loss seen since the last sample, as holes over packets scanned.
+    # one ewma step per packet, so a one packet batch moves the estimate
+    # as far as one packet of a large batch and no further
+    def on_loss_sample(self, missing, scanned):
+        if scanned > 0:
+            gain = 1 - (1 - LOSS_GAIN) ** scanned
+            self.lossRate += gain * (missing / scanned - self.lossRate)
+
+    @property
+    def parity(self):
+        wanted = math.ceil(self.lossRate * self.blockSize * FEC_MARGIN)
+        return max(self.minParity, min(self.maxParity, wanted))
+
+    # add a first transmission, returns parity datagrams once the block is full
+    def add(self, index, payload, last):
+        if self.block and index != self.block[-1][0] + 1:
+            # not consecutive (go-back-n rewound), start over
+            self.block = []
+        self.block.append((index, payload))
+        if len(self.block) < self.blockSize and not last:
+            return []
+
+        first = self.block[0][0]
+        payloads = [payload for _, payload in self.block]
+        self.block = []
+        m = self.parity
+        k = len(payloads)
+        self.paritySent += m
+        return [
+            pack_parity(first * self.messageSize, k, m, j, len(payloads[-1]), data, self.wide)
+            for j, data in enumerate(encode(payloads, m))
+        ]
+
+
+# receiver side ------------------------------------------------------
+# parity waits here until its block can be rebuilt or is complete
+class FecDecoder:
+    def __init__(self):
+        self.blocks = {}  # start offset -> [k, m, stride, last length, {j: parity}]
+        self.recovered = 0
+
+    # store parity, returns the start of its block
+    def add_parity(self, message):
+        start, k, m, j, lastLength, payload = unpack_parity(message)
+        block = self.blocks.setdefault(start, [k, m, len(payload), lastLength, {}])
+        block[4][j] = payload
+        return start
+
+    # block a data offset belongs to, when parity for it is waiting
+    def block_for(self, offset):
+        for start, (k, _, stride, _, _) in self.blocks.items():
+            if start <= offset < start + k * stride:
+                return start
+        return None
+
+    # rebuild what is missing if enough parity is in; has(offset) and
+    # read(offset, length) reach into the caller's received data.
+    # returns [(offset, payload)] and forgets blocks that are complete
+    def repair(self, start, has, read):
+        k, m, stride, lastLength, parity = self.blocks[start]
+        present = [i for i in range(k) if has(start + i * stride)]
+        if len(present) == k:
+            del self.blocks[start]
+            return []
+        if k - len(present) > len(parity):
+            return []
+
+        lengths = [stride] * (k - 1) + [lastLength]
+        known = {i: read(start + i * stride, lengths[i]) for i in present}
+        rebuilt = decode(known, parity, k, m, stride)
+        del self.blocks[start]
+        self.recovered += len(rebuilt)
+        return [(start + i * stride, data[: lengths[i]]) for i, data in sorted(rebuilt.items())]
+
+    # blocks wholly below the cumulative ack are never needed again
+    def forget_below(self, offset):
+        for start in [start for start, block in self.blocks.items() if start + block[0] * block[2] <= offset]:
+            del self.blocks[start]
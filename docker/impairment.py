@@ -0,0 +1,296 @@
+import argparse
+import heapq
+import random
+import select
+import signal
+import socket
+import sys
+import time
+
+# network impairment proxy ===========================================
+# a udp relay that stands in for the docker container's tc setup, so
+# every algorithm can be run on the same, repeatable path on localhost:
+#
+#   sender -> :5001 proxy -> receiver (--target, default :5002)
+#
+# training_profile.sh puts htb + netem on the receiver container's
+# eth0, which only shapes what the receiver sends, i.e. the acks. the
+# proxy impairs that direction by default, --direction data|both moves
+# or doubles it. each link emulates, in netem order:
+#   loss       dropped on enqueue with the current loss percentage
+#   limit      at most 1000 packets waiting, more are dropped
+#   reorder    7% (40% correlated) skip the 100ms delay and go first
+#   delay      everything else waits 100ms
+#   rate       htb token bucket in bits per second, counting headers
+# and the schedule of training_profile.sh: every second the rate is
+# halved (+2% loss) or cut to a third (+3% loss), back to 100kbit below
+# 2kbit, loss back to 0 above 20%. everything random comes from a seeded
+# rng per link, so a seed always reproduces the same path.
+
+PACKET_SIZE = 65535
+LISTEN_PORT = 5001
+TARGET_ADDRESS = ("127.0.0.1", 5002)
+
+# training_profile.sh
+DELAY = 0.1
+REORDER = 7
+REORDER_CORRELATION = 40
+LIMIT = 1000
+INITIAL_RATE = 100000  # bits per second, tc's unit for a bare number
+MIN_RATE = 2000
+MAX_LOSS = 20
+SCHEDULE_INTERVAL = 1
+
+# ethernet + ip + udp headers, htb counts the whole frame
+FRAME_OVERHEAD = 14 + 20 + 8
+HTB_BURST = 1600  # bytes, about one mtu
+
+DATA = "data"
+ACKS = "ack"
+BOTH = "both"
+
+
+# bandwidth and loss, stepped the way training_profile.sh does it
+class Schedule:
+    def __init__(self, seed, rate=INITIAL_RATE, loss=0, enabled=True):
+        self.rng = random.Random(f"{seed}-schedule")
+        self.initialRate = rate
+        self.rate = rate
+        self.loss = loss
+        self.enabled = enabled
+        self.steps = 0
+
+    def step(self):
+        if not self.enabled:
+            return
+        number = self.rng.randint(1, 10)
+        if number < 7:
+            self.rate //= 2
+            self.loss += 2
+        else:
+            self.rate //= 3
+            self.loss += 3
+
+        if self.rate < MIN_RATE:
+            self.rate = self.initialRate
+        if self.loss > MAX_LOSS:
+            self.loss = 0
+        self.steps += 1
+
+
+# correlated coin flips: with the correlation's probability repeat the
+# last outcome, otherwise flip fresh. netem blends the uniform draws
+# instead, which drags 7% at 40% correlation down to almost nothing;
+# this keeps the configured percentage and the burstiness.
+class CorrelatedChance:
+    def __init__(self, rng, correlation):
+        self.rng = rng
+        self.correlation = correlation / 100
+        self.last = False
+
+    def hit(self, probability):
+        if self.correlation and self.rng.random() < self.correlation:
+            return self.last
+        self.last = self.rng.random() < probability
+        return self.last
+
+
+# one direction through netem then htb
+class Link:
+    def __init__(self, name, schedule, seed, delay=DELAY, reorder=REORDER, reorderCorrelation=REORDER_CORRELATION, limit=LIMIT):
+        self.name = name
+        self.schedule = schedule
+        rng = random.Random(f"{seed}-{name}")
+        self.lossChance = CorrelatedChance(rng, 0)
+        self.reorderChance = CorrelatedChance(rng, reorderCorrelation)
+        self.delay = delay
+        self.reorder = reorder / 100
+        self.limit = limit
+
+        # netem's time ordered queue: (send time, order, data, socket, address)
+        self.queue = []
+        self.order = 0
+
+        # htb tokens in bytes
+        self.tokens = HTB_BURST
+        self.stamp = None
+
+        self.forwarded = 0
+        self.lost = 0
+        self.overflow = 0
+        self.reordered = 0
+
+    def enqueue(self, data, sock, address, now):
+        if self.schedule.loss and self.lossChance.hit(self.schedule.loss / 100):
+            self.lost += 1
+            return
+        if len(self.queue) >= self.limit:
+            self.overflow += 1
+            return
+
+        # gap 1: a reordered packet is sent right away, ahead of the rest
+        if self.reorder and self.reorderChance.hit(self.reorder):
+            sendTime = now
+            self.reordered += 1
+        else:
+            sendTime = now + self.delay
+        self.order += 1
+        heapq.heappush(self.queue, (sendTime, self.order, data, sock, address))
+
+    def _refill(self, now):
+        if self.stamp is not None:
+            self.tokens = min(HTB_BURST, self.tokens + (now - self.stamp) * self.schedule.rate / 8)
+        self.stamp = now
+
+    # send what is due and the rate allows
+    def flush(self, now):
+        self._refill(now)
+        while self.queue and self.queue[0][0] <= now:
+            size = len(self.queue[0][2]) + FRAME_OVERHEAD
+            if self.tokens < size and self.tokens < HTB_BURST:
+                break
+            _, _, data, sock, address = heapq.heappop(self.queue)
+            self.tokens -= size
+            sock.sendto(data, address)
+            self.forwarded += 1
+
+    # seconds until flush has something to do, None when empty
+    def wait_time(self, now):
+        if not self.queue:
+            return None
+        sendTime, _, data, _, _ = self.queue[0]
+        wait = max(0, sendTime - now)
+        size = len(data) + FRAME_OVERHEAD
+        if self.tokens < size and self.tokens < HTB_BURST:
+            wait = max(wait, (min(size, HTB_BURST) - self.tokens) * 8 / self.schedule.rate)
+        return wait
+
+    def stats(self):
+        return f"{self.name}: {self.forwarded} forwarded, {self.lost} lost, {self.overflow} over limit, {self.reordered} reordered"
+
+
+# passes straight through, for the direction that is not impaired
+class DirectLink:
+    def __init__(self, name):
+        self.name = name
+        self.forwarded = 0
+
+    def enqueue(self, data, sock, address, now):
+        sock.sendto(data, address)
+        self.forwarded += 1
+
+    def flush(self, now):
+        pass
+
+    def wait_time(self, now):
+        return None
+
+    def stats(self):
+        return f"{self.name}: {self.forwarded} forwarded"
+
+
+class ImpairmentProxy:
+    def __init__(self, listenPort=LISTEN_PORT, target=TARGET_ADDRESS, seed=1, direction=ACKS, schedule=None, **linkOptions):
+        self.target = target
+        self.schedule = schedule or Schedule(seed)
+        self.data = Link(DATA, self.schedule, seed, **linkOptions) if direction in (DATA, BOTH) else DirectLink(DATA)
+        self.acks = Link(ACKS, self.schedule, seed, **linkOptions) if direction in (ACKS, BOTH) else DirectLink(ACKS)
+
+        self.front = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.front.bind(("0.0.0.0", listenPort))
+
+        # one upstream socket per sender, the receiver sees distinct flows
+        self.upstream = {}  # sender address -> socket
+        self.senders = {}  # socket -> sender address
+        self.running = False
+
+    def upstream_socket(self, client):
+        sock = self.upstream.get(client)
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("127.0.0.1", 0))
+            self.upstream[client] = sock
+            self.senders[sock] = client
+        return sock
+
+    def run(self, duration=None):
+        start = time.time()
+        nextStep = start
+        self.running = True
+        try:
+            while self.running and (duration is None or time.time() - start < duration):
+                now = time.time()
+                if now >= nextStep:
+                    self.schedule.step()
+                    nextStep += SCHEDULE_INTERVAL
+
+                waits = [nextStep - now] + [w for w in (self.data.wait_time(now), self.acks.wait_time(now)) if w is not None]
+                readable, _, _ = select.select([self.front] + list(self.senders), [], [], max(0, min(waits)))
+
+                now = time.time()
+                for sock in readable:
+                    data, address = sock.recvfrom(PACKET_SIZE)
+                    if sock is self.front:
+                        self.data.enqueue(data, self.upstream_socket(address), self.target, now)
+                    else:
+                        self.acks.enqueue(data, self.front, self.senders[sock], now)
+
+                self.data.flush(now)
+                self.acks.flush(now)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    # for a proxy running in a thread, returns within a schedule interval
+    def stop(self):
+        self.running = False
+
+    def report(self):
+        print(f"Schedule steps: {self.schedule.steps}, rate {self.schedule.rate} bit/s, loss {self.schedule.loss}%")
+        print(self.data.stats())
+        print(self.acks.stats())
+
+    def close(self):
+        for sock in self.senders:
+            sock.close()
+        self.front.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listen", type=int, default=LISTEN_PORT, help="port the senders talk to")
+    parser.add_argument("--target-host", default=TARGET_ADDRESS[0], help="receiver address")
+    parser.add_argument("--target-port", type=int, default=TARGET_ADDRESS[1], help="receiver port")
+    parser.add_argument("--seed", type=int, default=1, help="same seed, same path")
+    parser.add_argument("--direction", choices=[ACKS, DATA, BOTH], default=ACKS,
+                        help="which way is impaired, the docker profile shapes the receiver's acks")
+    parser.add_argument("--delay", type=float, default=DELAY, help="seconds")
+    parser.add_argument("--reorder", type=float, default=REORDER, help="percent sent without delay")
+    parser.add_argument("--reorder-correlation", type=float, default=REORDER_CORRELATION, help="percent")
+    parser.add_argument("--limit", type=int, default=LIMIT, help="packets queued before drops")
+    parser.add_argument("--rate", type=int, default=INITIAL_RATE, help="starting rate in bits per second")
+    parser.add_argument("--loss", type=float, default=0, help="starting loss percent")
+    parser.add_argument("--fixed", action="store_true", help="keep --rate and --loss, no schedule")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    proxy = ImpairmentProxy(
+        args.listen,
+        (args.target_host, args.target_port),
+        seed=args.seed,
+        direction=args.direction,
+        schedule=Schedule(args.seed, args.rate, args.loss, enabled=not args.fixed),
+        delay=args.delay,
+        reorder=args.reorder,
+        reorderCorrelation=args.reorder_correlation,
+        limit=args.limit,
+    )
+    # stop with the stats printed on kill as well as ctrl-c
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"Impairment proxy on :{args.listen} -> {args.target_host}:{args.target_port} ({args.direction}, seed {args.seed})")
+    try:
+        proxy.run(args.duration)
+    finally:
+        proxy.report()
@@ -0,0 +1,41 @@
+# token bucket pacer ================================================
+# tokens refill at `rate` packets per second up to `burst`, a packet may
+# leave only with a token in hand. instead of blasting a whole window
+# back to back into the HTB queue, transmissions are spread over the rtt.
+# a rate of None turns the bucket off and every packet goes at once.
+
+PACING_BURST = 2
+
+
+class TokenBucket:
+    def __init__(self, rate=None, burst=PACING_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = None
+
+    def _refill(self, now):
+        if self.stamp is not None and self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    # bank what the old rate earned before switching
+    def set_rate(self, rate, now):
+        self._refill(now)
+        self.rate = rate
+
+    def consume(self, now):
+        if not self.rate:
+            return True
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    # seconds until the next token, 0 if one is ready
+    def wait_time(self, now):
+        if not self.rate:
+            return 0
+        self._refill(now)
+        return max(0, (1 - self.tokens) / self.rate)
@@ -0,0 +1,57 @@
+import mmap
+import os
+
+# zero-copy payload source ===========================================
+# map the file once and hand out memoryview slices by packet index,
+# so nothing gets copied until the datagram actually goes out.
+# startup time and memory stay flat no matter how big the file is.
+
+
+class PayloadSource:
+    def __init__(self, path, messageSize):
+        self.messageSize = messageSize
+
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+
+            # mmap refuses empty files, fall back to an empty buffer
+            if self.size > 0:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+            else:
+                self._map = None
+                self._view = memoryview(b"")
+
+        # number of packets, last one may be short
+        self.count = (self.size + messageSize - 1) // messageSize
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError("packet index out of range")
+
+        start = index * self.messageSize
+        return self._view[start : start + self.messageSize]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def close(self):
+        # views handed out must be gone before the map can close
+        self._view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
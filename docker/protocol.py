@@ -0,0 +1,202 @@
+import struct
+
+# shared wire format =================================================
+# data:  [seq id 4 bytes, signed big endian byte offset][payload]
+# ack:   [seq id 4 bytes][b'ack' or b'fin'][sack blocks]
+# a sack block is [start 4 bytes][end 4 bytes], a half-open byte range
+# received above the cumulative ack, most recent block first.
+# old senders only read the first 4 bytes so the blocks are invisible to them
+#
+# payload size, only sent by a sender started with --payload:
+# request: [seq id -3][b'==SIZE=='][wanted payload 4 bytes]
+# reply:   [seq id -3][b'siz'][accepted payload 4 bytes]
+#
+# resume, only sent by a sender started with --resume:
+# request: [seq id -4][b'==RESUME=='][file size 8 bytes][file id 8 bytes]
+# reply:   [seq id -4][b'res'][range count 2 bytes][start 8 bytes][end 8 bytes]...
+# the ranges are what the receiver already holds of that file, lowest
+# first; a reply that would not fit in a datagram leaves out the highest
+#
+# wide headers, version 2, for files of 2 GiB and more. a sender asks
+# first and only goes wide when the receiver answers, a receiver only
+# answers wide packets with wide acks, so 4 byte peers never see them:
+# version: [seq id -5][b'==VERSION==' or b'ver'][version 1 byte]
+# data:    [seq id -6][offset 8 bytes][payload]
+# ack:     [seq id -6][ack 8 bytes][b'ack' or b'fin'][start 8 bytes][end 8 bytes]...
+# parity:  [seq id -7][block start 8 bytes]... (fec.py)
+
+SEQ_ID_SIZE = 4
+ACK_MESSAGE_SIZE = 3
+MAX_SACK_BLOCKS = 3
+
+SEQ_ID = struct.Struct(">i")
+SACK_BLOCK = struct.Struct(">ii")
+
+# largest offset a 4 byte header carries
+MAX_SEQ_OFFSET = 2**31 - 1
+
+SIZE_SEQ_ID = -3
+SIZE_REQUEST = b"==SIZE=="
+SIZE_REPLY = b"siz"
+SIZE_FIELD = struct.Struct(">I")
+
+RESUME_SEQ_ID = -4
+RESUME_REQUEST = b"==RESUME=="
+RESUME_REPLY = b"res"
+RESUME_FIELDS = struct.Struct(">q8s")
+RESUME_COUNT = struct.Struct(">H")
+RESUME_RANGE = struct.Struct(">qq")
+
+VERSION_SEQ_ID = -5
+VERSION_REQUEST = b"==VERSION=="
+VERSION_REPLY = b"ver"
+VERSION_FIELD = struct.Struct(">B")
+LEGACY_VERSION = 1
+WIDE_VERSION = 2
+PROTOCOL_VERSION = WIDE_VERSION
+
+WIDE_SEQ_ID = -6
+WIDE_HEADER = struct.Struct(">iq")
+WIDE_SACK_BLOCK = struct.Struct(">qq")
+WIDE_EXTRA = WIDE_HEADER.size - SEQ_ID_SIZE  # bytes a wide header adds
+
+# largest udp payload over ipv4
+MAX_DATAGRAM = 65507
+MAX_RESUME_RANGES = (MAX_DATAGRAM - SEQ_ID_SIZE - ACK_MESSAGE_SIZE - RESUME_COUNT.size) // RESUME_RANGE.size
+
+
+def header_size(wide):
+    return WIDE_HEADER.size if wide else SEQ_ID_SIZE
+
+
+def pack_header(offset, wide=False):
+    return WIDE_HEADER.pack(WIDE_SEQ_ID, offset) if wide else SEQ_ID.pack(offset)
+
+
+def pack_sack_blocks(blocks, wide=False):
+    block = WIDE_SACK_BLOCK if wide else SACK_BLOCK
+    return b"".join(block.pack(start, end) for start, end in blocks)
+
+
+# one ack buffer reused for every ack: the seq id and sack blocks are
+# patched in place and a view of the used part goes to sendto
+class AckTemplate:
+    def __init__(self, message=b"ack", maxBlocks=MAX_SACK_BLOCKS, wide=False):
+        self.wide = wide
+        self.headerSize = header_size(wide)
+        self.block = WIDE_SACK_BLOCK if wide else SACK_BLOCK
+        self.buffer = bytearray(self.headerSize + ACK_MESSAGE_SIZE + maxBlocks * self.block.size)
+        self.buffer[self.headerSize : self.headerSize + ACK_MESSAGE_SIZE] = message
+        self.view = memoryview(self.buffer)
+        self.maxBlocks = maxBlocks
+
+    def pack(self, seqId, blocks=()):
+        if self.wide:
+            WIDE_HEADER.pack_into(self.buffer, 0, WIDE_SEQ_ID, seqId)
+        else:
+            SEQ_ID.pack_into(self.buffer, 0, seqId)
+        offset = self.headerSize + ACK_MESSAGE_SIZE
+        for start, end in blocks[: self.maxBlocks]:
+            self.block.pack_into(self.buffer, offset, start, end)
+            offset += self.block.size
+        return self.view[:offset]
+
+
+# (ack id, header size) of either header
+def unpack_ack(ack):
+    (seqId,) = SEQ_ID.unpack_from(ack)
+    if seqId == WIDE_SEQ_ID:
+        return WIDE_HEADER.unpack_from(ack)[1], WIDE_HEADER.size
+    return seqId, SEQ_ID_SIZE
+
+
+def unpack_sack_blocks(ack, headerSize=SEQ_ID_SIZE):
+    block = WIDE_SACK_BLOCK if headerSize == WIDE_HEADER.size else SACK_BLOCK
+    offset = headerSize + ACK_MESSAGE_SIZE
+    blocks = []
+    while offset + block.size <= len(ack):
+        blocks.append(block.unpack_from(ack, offset))
+        offset += block.size
+    return blocks
+
+
+def pack_size_request(size):
+    return int.to_bytes(SIZE_SEQ_ID, SEQ_ID_SIZE, byteorder="big", signed=True) + SIZE_REQUEST + SIZE_FIELD.pack(size)
+
+
+# wanted payload from a request's message (the bytes after the seq id),
+# None if this is not a whole size request
+def unpack_size_request(message):
+    if message[:len(SIZE_REQUEST)] != SIZE_REQUEST or len(message) < len(SIZE_REQUEST) + SIZE_FIELD.size:
+        return None
+    return SIZE_FIELD.unpack_from(message, len(SIZE_REQUEST))[0]
+
+
+def pack_size_reply(size):
+    return int.to_bytes(SIZE_SEQ_ID, SEQ_ID_SIZE, byteorder="big", signed=True) + SIZE_REPLY + SIZE_FIELD.pack(size)
+
+
+# accepted payload, None if this is not a size reply
+def unpack_size_reply(packet):
+    offset = SEQ_ID_SIZE + ACK_MESSAGE_SIZE
+    if packet[SEQ_ID_SIZE:offset] != SIZE_REPLY or len(packet) < offset + SIZE_FIELD.size:
+        return None
+    return SIZE_FIELD.unpack_from(packet, offset)[0]
+
+
+def pack_resume_request(size, fileId):
+    return SEQ_ID.pack(RESUME_SEQ_ID) + RESUME_REQUEST + RESUME_FIELDS.pack(size, fileId)
+
+
+# file size and id from a request's message (the bytes after the seq id),
+# None if this is not a whole resume request
+def unpack_resume_request(message):
+    if message[:len(RESUME_REQUEST)] != RESUME_REQUEST or len(message) < len(RESUME_REQUEST) + RESUME_FIELDS.size:
+        return None
+    return RESUME_FIELDS.unpack_from(message, len(RESUME_REQUEST))
+
+
+def pack_resume_reply(ranges):
+    ranges = list(ranges)[:MAX_RESUME_RANGES]
+    return (
+        SEQ_ID.pack(RESUME_SEQ_ID)
+        + RESUME_REPLY
+        + RESUME_COUNT.pack(len(ranges))
+        + b"".join(RESUME_RANGE.pack(start, end) for start, end in ranges)
+    )
+
+
+# [(start, end)] the receiver holds, None if this is not a resume reply
+def unpack_resume_reply(packet):
+    offset = SEQ_ID_SIZE + ACK_MESSAGE_SIZE
+    if packet[SEQ_ID_SIZE:offset] != RESUME_REPLY or len(packet) < offset + RESUME_COUNT.size:
+        return None
+    (count,) = RESUME_COUNT.unpack_from(packet, offset)
+    offset += RESUME_COUNT.size
+    if len(packet) < offset + count * RESUME_RANGE.size:
+        return None
+    return [RESUME_RANGE.unpack_from(packet, offset + i * RESUME_RANGE.size) for i in range(count)]
+
+
+def pack_version_request(version):
+    return SEQ_ID.pack(VERSION_SEQ_ID) + VERSION_REQUEST + VERSION_FIELD.pack(version)
+
+
+# version a request asks for (the bytes after the seq id), None if this
+# is not a whole version request
+def unpack_version_request(message):
+    if message[:len(VERSION_REQUEST)] != VERSION_REQUEST or len(message) < len(VERSION_REQUEST) + VERSION_FIELD.size:
+        return None
+    return VERSION_FIELD.unpack_from(message, len(VERSION_REQUEST))[0]
+
+
+def pack_version_reply(version):
+    return SEQ_ID.pack(VERSION_SEQ_ID) + VERSION_REPLY + VERSION_FIELD.pack(version)
+
+
+# agreed version, None if this is not a version reply
+def unpack_version_reply(packet):
+    offset = SEQ_ID_SIZE + ACK_MESSAGE_SIZE
+    if packet[SEQ_ID_SIZE:offset] != VERSION_REPLY or len(packet) < offset + VERSION_FIELD.size:
+        return None
+    return VERSION_FIELD.unpack_from(packet, offset)[0]
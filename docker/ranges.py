@@ -0,0 +1,79 @@
+import bisect
+
+# compact set of received byte ranges =================================
+# kept as two sorted lists of half-open [start, end) intervals that
+# never overlap or touch, in-order arrival only ever extends the last one
+
+
+class RangeSet:
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    # add [start, end), returns True if any of it was new
+    def add(self, start, end):
+        if end <= start:
+            return False
+
+        starts, ends = self.starts, self.ends
+
+        # fast path, extends or follows the last range
+        if not starts or start >= starts[-1]:
+            if starts and start <= ends[-1]:
+                if end <= ends[-1]:
+                    return False
+                ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+            return True
+
+        # first range that could touch, last range that could touch
+        lo = bisect.bisect_left(ends, start)
+        hi = bisect.bisect_right(starts, end)
+
+        if lo < hi and starts[lo] <= start and end <= ends[lo]:
+            return False
+
+        if lo < hi:
+            start = min(start, starts[lo])
+            end = max(end, ends[hi - 1])
+
+        starts[lo:hi] = [start]
+        ends[lo:hi] = [end]
+        return True
+
+    def contains(self, start, end):
+        i = bisect.bisect_right(self.starts, start) - 1
+        return i >= 0 and end <= self.ends[i]
+
+    # range holding offset, None if not received
+    def find(self, offset):
+        i = bisect.bisect_right(self.starts, offset) - 1
+        if i >= 0 and offset < self.ends[i]:
+            return self.starts[i], self.ends[i]
+        return None
+
+    # ranges starting above offset, highest first
+    def above(self, offset):
+        i = len(self.starts) - 1
+        while i >= 0 and self.starts[i] > offset:
+            yield self.starts[i], self.ends[i]
+            i -= 1
+
+    # end of the contiguous run that begins at offset, offset if none
+    def contiguous_end(self, offset=0):
+        i = bisect.bisect_right(self.starts, offset) - 1
+        if i >= 0 and offset <= self.ends[i]:
+            return self.ends[i]
+        return offset
+
+    # largest end seen, 0 when empty
+    def high(self):
+        return self.ends[-1] if self.ends else 0
@@ -1,72 +1,535 @@
+import argparse
+import os
 import random
+import signal
 import socket
+import sys
+import time
+
+import checkpoint
+from fec import PARITY_OVERHEAD, PARITY_SEQ_ID, WIDE_PARITY_SEQ_ID, FecDecoder
+from protocol import (
+    MAX_DATAGRAM,
+    MAX_SACK_BLOCKS,
+    PROTOCOL_VERSION,
+    RESUME_SEQ_ID,
+    SEQ_ID,
+    SIZE_SEQ_ID,
+    VERSION_SEQ_ID,
+    WIDE_HEADER,
+    WIDE_SEQ_ID,
+    AckTemplate,
+    pack_header,
+    pack_resume_reply,
+    pack_sack_blocks,
+    pack_size_reply,
+    pack_version_reply,
+    unpack_resume_request,
+    unpack_size_request,
+    unpack_version_request,
+)
+from ranges import RangeSet
+from tracing import ACK_SENT, FLOW_CLOSE, FLOW_OPEN, RECV, REPAIR, Tracer, add_trace_arguments, tracer_from_args
 
 PACKET_SIZE = 1024
 SEQ_ID_SIZE = 4
 MESSAGE_SIZE = PACKET_SIZE - SEQ_ID_SIZE
-EXPECTED_SEQ_ID = 0
-RECEIVED_DATA = {}
-
-def create_acknowledgement(seq_id, message):
-    return int.to_bytes(seq_id, SEQ_ID_SIZE, signed=True, byteorder='big') + message.encode()
-
-# create a udp socket
-with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_socket:
-    # bind the socket to a OS port
-    # bind to 0.0.0.0 so external 
-    udp_socket.bind(("0.0.0.0", 5001))
-
-    print("Receiver running")
-    # start receiving packets
-    while True:
-        timeouts = 0
-        try:
-            # receive the packet
-            packet, client = udp_socket.recvfrom(PACKET_SIZE)
-            
-            # get the message id
-            seq_id, message = packet[:SEQ_ID_SIZE], packet[SEQ_ID_SIZE:]
-            
-            # check if finack message
-            if message == b'==FINACK==':
+OUTPUT_PATH = '/hdd/file2.mp3'
+OUTPUT_DIR = '/hdd'
+RECEIVER_PORT = 5001
+TRACE_PATH = 'receiver-trace.jsonl'
+FINACK = b'==FINACK=='
+FINACK_SIZE = SEQ_ID_SIZE + len(FINACK)
+
+# largest payload accepted from a sender that negotiates, room left for
+# a wide header and fec parity
+MAX_PAYLOAD = MAX_DATAGRAM - WIDE_HEADER.size - PARITY_OVERHEAD
+
+# big payloads need more than the default socket buffer to ride out a window
+RECEIVE_BUFFER = 4 * 1024 * 1024
+
+# stream mode grows the output file in steps instead of per packet
+PREALLOCATE_STEP = 64 * 1024 * 1024
+
+# multi mode, flows silent this long are closed and their file finished
+IDLE_TIMEOUT = 30
+GC_INTERVAL = 1
+
+# resumable flows write their received ranges out this often
+CHECKPOINT_INTERVAL = 1
+
+# delayed acks, off by default: every packet is acked as it arrives
+ACK_EVERY = 1
+ACK_DELAY = 0.005
+MIN_WAIT = 0.0001
+
+# receiver counters, kept in a flat array so sharded workers can share them
+COUNTERS = ('packets', 'bytes', 'acks', 'flows', 'finished', 'idle', 'recovered', 'coalesced')
+PACKETS, BYTES, ACKS, FLOWS, FINISHED, IDLE, RECOVERED, COALESCED = range(len(COUNTERS))
+
+
+def create_acknowledgement(seq_id, message, blocks=(), wide=False):
+    return pack_header(seq_id, wide) + message.encode() + pack_sack_blocks(blocks, wide)
+
+
+# ack policy ==========================================================
+# an in order packet only counts towards the next ack: the Nth one or
+# the delayed ack timer sends it, whichever comes first. anything the
+# sender has to react to goes out right away, so gaps, duplicates and
+# rebuilt data are never held back. the senders grow their window by
+# packets acked rather than acks received, so fewer acks cost no growth.
+class AckPolicy:
+    def __init__(self, every=ACK_EVERY, delay=ACK_DELAY):
+        self.every = every
+        self.delay = delay
+        self.pending = 0  # packets covered by the next ack
+        self.deadline = None
+
+    # in order packet, True when it should be acked now
+    def on_in_order(self, now):
+        self.pending += 1
+        if self.pending >= self.every:
+            return True
+        if self.deadline is None:
+            self.deadline = now + self.delay
+        return False
+
+    def due(self, now):
+        return self.deadline is not None and now >= self.deadline
+
+    def acked(self):
+        self.pending = 0
+        self.deadline = None
+
+
+# per sender state ====================================================
+# one of these per client address, so many senders can push at once
+class Flow:
+    def __init__(self, output, stream, acks=None, resume=None):
+        self.output = output
+        self.expected_seq_id = 0
+        self.received_data = {}
+
+        # received byte ranges, the only per-packet state kept in stream mode
+        self.received_ranges = RangeSet()
+        self.allocated_size = 0
+
+        # (file size, file id) of a sender running --resume, its data goes
+        # straight to disk and the ranges to a checkpoint beside it
+        self.resume = resume
+        self.checkpoint_path = checkpoint.checkpoint_path(output)
+        self.dirty = False
+        self.resumed_bytes = 0
+
+        # stream mode writes straight into the output file
+        self.fd = None
+        if resume is not None:
+            self.open_resumed(*resume)
+        else:
+            # this flow truncates or rewrites the output, a checkpoint of
+            # an earlier resumable run no longer describes it
+            checkpoint.remove(self.checkpoint_path)
+            if stream:
+                self.fd = os.open(output, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+
+        # parity blocks from a sender running --fec
+        self.decoder = FecDecoder()
+        self.acks = acks or AckPolicy()
+
+        # the sender uses 8 byte offsets, acks answer in kind
+        self.wide = False
+
+        self.last_seen = time.time()
+        self.packets = 0
+        self.bytes = 0
+
+    # keep what an earlier run of the same file left, or start it over
+    def open_resumed(self, size, file_id):
+        saved = checkpoint.load(self.checkpoint_path)
+        if saved is not None and saved[:2] == (size, file_id) and os.path.exists(self.output):
+            self.fd = os.open(self.output, os.O_RDWR)
+            self.received_ranges = saved[2]
+            self.expected_seq_id = self.received_ranges.contiguous_end(0)
+            self.allocated_size = os.fstat(self.fd).st_size
+            self.resumed_bytes = sum(end - start for start, end in self.received_ranges)
+        else:
+            self.fd = os.open(self.output, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            self.dirty = True
+
+    # flush the file, then record what it holds
+    def checkpoint(self):
+        if not self.dirty:
+            return
+        os.fsync(self.fd)
+        checkpoint.save(self.checkpoint_path, self.resume[0], self.resume[1], self.received_ranges)
+        self.dirty = False
+
+    # next byte, with nothing received beyond it yet
+    def in_order(self, seq_id, message):
+        return len(message) > 0 and seq_id == self.expected_seq_id == self.received_ranges.high()
+
+    # data packet, returns what parity waiting for it rebuilt
+    def receive(self, seq_id, message):
+        self.last_seen = time.time()
+        self.packets += 1
+        self.store(seq_id, message)
+
+        # data arriving after its parity can complete a block too
+        if self.decoder.blocks:
+            start = self.decoder.block_for(seq_id)
+            if start is not None:
+                return self.repair(start)
+        return []
+
+    # parity packet, returns [(offset, length)] it rebuilt
+    def receive_parity(self, packet):
+        self.last_seen = time.time()
+        self.packets += 1
+        return self.repair(self.decoder.add_parity(bytes(packet)))
+
+    def repair(self, start):
+        repaired = self.decoder.repair(start, self.has, self.read)
+        for offset, payload in repaired:
+            self.store(offset, payload)
+        self.decoder.forget_below(self.expected_seq_id)
+        return [(offset, len(payload)) for offset, payload in repaired]
+
+    def has(self, offset):
+        return self.received_ranges.find(offset) is not None
+
+    def read(self, offset, length):
+        if self.fd is None:
+            return self.received_data[offset]
+        return os.pread(self.fd, length, offset)
+
+    def store(self, seq_id, message):
+        # keep track of received sequences
+        is_new = self.received_ranges.add(seq_id, seq_id + len(message))
+        if is_new:
+            self.bytes += len(message)
+            self.dirty = True
+        if self.fd is None:
+            # the receive buffer is reused, buffered mode keeps a copy
+            self.received_data[seq_id] = bytes(message)
+        elif is_new and seq_id >= 0:
+            self.stream_write(seq_id, message)
+
+        # check if sequence id is same as expected and move forward
+        if seq_id <= self.expected_seq_id and len(message) > 0:
+            self.expected_seq_id = self.received_ranges.contiguous_end(0)
+
+    # write payload at its byte offset, making room ahead of it first
+    def stream_write(self, seq_id, message):
+        end = seq_id + len(message)
+        if end > self.allocated_size:
+            self.allocated_size = max(end, self.allocated_size + min(self.allocated_size, PREALLOCATE_STEP), MESSAGE_SIZE * 1024)
+            try:
+                os.posix_fallocate(self.fd, 0, self.allocated_size)
+            except (AttributeError, OSError):
+                # filesystem without fallocate (docker desktop mounts), sparse extend
+                os.ftruncate(self.fd, self.allocated_size)
+        os.pwrite(self.fd, message, seq_id)
+
+    # out of order ranges above the cumulative ack, the one just filled first
+    def sack_blocks(self, seq_id, limit):
+        if limit <= 0 or self.received_ranges.high() <= self.expected_seq_id:
+            return ()
+        blocks = []
+        recent = self.received_ranges.find(seq_id) if seq_id > self.expected_seq_id else None
+        if recent is not None:
+            blocks.append(recent)
+        for block in self.received_ranges.above(self.expected_seq_id):
+            if len(blocks) >= limit:
                 break
-            
-            # if the message id is -1, we have received all the packets
-            seq_id = int.from_bytes(seq_id, signed=True, byteorder='big')
-            
-            # keep track of received sequences
-            RECEIVED_DATA[seq_id] = message
-            
-            # check if sequence id is same as expected and move forward
-            if seq_id <= EXPECTED_SEQ_ID and len(RECEIVED_DATA[seq_id]) > 0:
-                while EXPECTED_SEQ_ID in RECEIVED_DATA:
-                    EXPECTED_SEQ_ID += len(RECEIVED_DATA[seq_id])
-
-            # FOR TESTING OUTPUT PURPOSE!!! =====================================
-            print(f"Received packet ID [{seq_id}] ({len(message)} byte) <<<")
-            
-            
-            # create ack id
-            ack_id = EXPECTED_SEQ_ID
-            
-            # create the acknowledgement
-            acknowledgement = create_acknowledgement(ack_id, 'ack')
-
-            # send the acknowledgement
-            udp_socket.sendto(acknowledgement, client)
-
-            # FOR TESTING OUTPUT PURPOSE!!! =====================================
-            print(f"Returning ACK ID [{ack_id}] >>>")
-
-            # check if all data received (empty message)
-            if len(message) == 0 and ack_id == seq_id:
-                ack = create_acknowledgement(ack_id, 'ack')
-                fin = create_acknowledgement(ack_id + 3, 'fin')
-                udp_socket.sendto(ack, client)
-                udp_socket.sendto(fin, client)
-        except socket.timeout:
-            timeouts += 1
-
-with open('/hdd/file2.mp3', 'wb') as f:
-    for sid in sorted(RECEIVED_DATA.keys()):
-        f.write(RECEIVED_DATA[sid])
\ No newline at end of file
+            if block != recent:
+                blocks.append(block)
+        return blocks
+
+    # finish the output file
+    def close(self):
+        if self.fd is not None:
+            # drop the preallocated tail, data is already on disk
+            os.ftruncate(self.fd, self.received_ranges.high())
+            if self.resume is not None:
+                if self.expected_seq_id >= self.resume[0]:
+                    checkpoint.remove(self.checkpoint_path)
+                else:
+                    self.checkpoint()
+            os.close(self.fd)
+            self.fd = None
+        else:
+            with open(self.output, 'wb') as f:
+                for sid in sorted(self.received_data.keys()):
+                    f.write(self.received_data[sid])
+            self.received_data = {}
+
+
+# each sender gets its own file, named after its address
+def flow_output(args, client):
+    if not args.multi:
+        return args.output
+    host, port = client[0], client[1]
+    name, ext = os.path.splitext(os.path.basename(OUTPUT_PATH))
+    return os.path.join(args.output_dir, f"{name}_{host}_{port}{ext}")
+
+
+# a restarted sender has a new port, so resumable files are named after
+# the file it sends instead
+def resume_output(args, client, file_id):
+    if not args.multi:
+        return args.output
+    name, ext = os.path.splitext(os.path.basename(OUTPUT_PATH))
+    return os.path.join(args.output_dir, f"{name}_{client[0]}_{file_id.hex()}{ext}")
+
+
+def serve(udp_socket, args, counters=None, trace=None):
+    # single mode keeps one flow for everyone and exits on the first FINACK
+    flows = {}
+    finished = {}  # recently closed clients, late retransmits are ignored
+    delayed = {}  # flows holding back an ack, oldest deadline first
+    last_gc = last_checkpoint = time.time()
+    udp_socket.settimeout(GC_INTERVAL)
+    timeout = GC_INTERVAL
+    udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+
+    # every datagram lands in the same buffer, the payload is a view into
+    # it that is written out or copied before the next receive
+    buffer = bytearray(args.max_payload + WIDE_HEADER.size + PARITY_OVERHEAD)
+    view = memoryview(buffer)
+    ack_templates = {False: AckTemplate(maxBlocks=args.sack_blocks), True: AckTemplate(maxBlocks=args.sack_blocks, wide=True)}
+    if counters is None:
+        counters = [0] * len(COUNTERS)
+    if trace is None:
+        trace = Tracer()
+
+    # cumulative ack plus sack blocks around seq_id, clears any held back ack
+    def send_ack(flow, client, seq_id):
+        ack_id = flow.expected_seq_id
+        blocks = flow.sack_blocks(seq_id, args.sack_blocks)
+        udp_socket.sendto(ack_templates[flow.wide].pack(ack_id, blocks), client)
+        counters[ACKS] += 1
+        if trace.debug:
+            trace.record(ACK_SENT, ack_id, len(blocks))
+        flow.acks.acked()
+        delayed.pop(client, None)
+        return ack_id
+
+    def open_flow(key, client, output, resume=None):
+        flow = flows[key] = Flow(output, args.stream, AckPolicy(args.ack_every, args.ack_delay), resume)
+        counters[FLOWS] += 1
+        if trace.info:
+            trace.record(FLOW_OPEN, client[1], len(flows))
+        print(f"New flow from {client}" + (f", {flow.resumed_bytes} bytes kept from an earlier run" if resume else ""))
+        return flow
+
+    # a sender starting over with --resume takes over the flow of its
+    # earlier run if that is still open, otherwise whatever is on disk
+    def resume_flow(key, client, size, file_id):
+        output = resume_output(args, client, file_id)
+        for old_key, flow in list(flows.items()):
+            if flow.output != output and old_key != key:
+                continue
+            del flows[old_key]
+            for held in [held for held, waiting in delayed.items() if waiting is flow]:
+                del delayed[held]
+            if flow.output == output and flow.resume == (size, file_id):
+                flows[key] = flow
+                return flow
+            flow.close()
+        finished.pop(key, None)
+        return open_flow(key, client, output, (size, file_id))
+
+    try:
+        # start receiving packets
+        while True:
+            # wake up for the oldest held back ack
+            wait = GC_INTERVAL
+            if delayed:
+                # a zero timeout would turn the socket non-blocking
+                wait = min(wait, max(MIN_WAIT, next(iter(delayed.values())).acks.deadline - time.time()))
+            if wait != timeout:
+                udp_socket.settimeout(wait)
+                timeout = wait
+
+            try:
+                # receive the packet
+                size, client = udp_socket.recvfrom_into(buffer)
+                if size < SEQ_ID_SIZE:
+                    continue
+                key = client if args.multi else None
+
+                # get the message id
+                seq_id, message = SEQ_ID.unpack_from(buffer)[0], view[SEQ_ID_SIZE:size]
+
+                # payload size request, answered before any flow exists.
+                # only the control id marks one, data may hold the same bytes
+                if seq_id == SIZE_SEQ_ID:
+                    wanted = unpack_size_request(message)
+                    if wanted is not None:
+                        udp_socket.sendto(pack_size_reply(min(wanted, args.max_payload)), client)
+                    continue
+
+                # header version request, the receiver reads every version it knows
+                if seq_id == VERSION_SEQ_ID:
+                    wanted = unpack_version_request(message)
+                    if wanted is not None:
+                        udp_socket.sendto(pack_version_reply(min(wanted, PROTOCOL_VERSION)), client)
+                    continue
+
+                # resume request, answered with the ranges already held
+                if seq_id == RESUME_SEQ_ID:
+                    request = unpack_resume_request(message)
+                    if request is not None:
+                        flow = resume_flow(key, client, *request)
+                        udp_socket.sendto(pack_resume_reply(flow.received_ranges), client)
+                    continue
+
+                # check if finack message
+                if size == FINACK_SIZE and message == FINACK:
+                    flow = flows.pop(key, None)
+                    delayed.pop(client, None)
+                    if flow is not None:
+                        flow.close()
+                        counters[FINISHED] += 1
+                        if trace.info:
+                            trace.record(FLOW_CLOSE, client[1], flow.bytes)
+                        print(f"Flow {client} finished, {flow.bytes} bytes in {flow.packets} packets ({flow.decoder.recovered} rebuilt) -> {flow.output}")
+                    if not args.multi:
+                        break
+                    finished[key] = time.time()
+                    continue
+
+                if key in finished:
+                    continue
+
+                flow = flows.get(key)
+                if flow is None:
+                    flow = open_flow(key, client, flow_output(args, client))
+
+                # wide header, the 8 byte offset follows the marker
+                if seq_id == WIDE_SEQ_ID:
+                    if size < WIDE_HEADER.size:
+                        continue
+                    seq_id, message = WIDE_HEADER.unpack_from(buffer)[1], view[WIDE_HEADER.size:size]
+                    flow.wide = True
+
+                in_order = False
+                if seq_id == PARITY_SEQ_ID or seq_id == WIDE_PARITY_SEQ_ID:
+                    flow.wide = seq_id == WIDE_PARITY_SEQ_ID
+                    repaired = flow.receive_parity(view[:size])
+                    counters[PACKETS] += 1
+
+                    # nothing rebuilt, an ack would only look like a duplicate
+                    if not repaired:
+                        continue
+                else:
+                    in_order = flow.in_order(seq_id, message)
+                    repaired = flow.receive(seq_id, message)
+                    counters[PACKETS] += 1
+                    counters[BYTES] += len(message)
+                    if trace.debug:
+                        trace.record(RECV, seq_id, len(message))
+
+                # sack the newest rebuilt range
+                if repaired:
+                    counters[RECOVERED] += len(repaired)
+                    if trace.info:
+                        for offset, length in repaired:
+                            trace.record(REPAIR, offset, length)
+                    seq_id = repaired[-1][0]
+
+                # in order data may wait for the next one, the rest is acked now
+                elif in_order and not flow.acks.on_in_order(time.time()):
+                    counters[COALESCED] += 1
+                    delayed.setdefault(client, flow)
+                    continue
+
+                ack_id = send_ack(flow, client, seq_id)
+
+                # check if all data received (empty message)
+                if len(message) == 0 and ack_id == seq_id:
+                    ack = create_acknowledgement(ack_id, 'ack', wide=flow.wide)
+                    fin = create_acknowledgement(ack_id + 3, 'fin', wide=flow.wide)
+                    udp_socket.sendto(ack, client)
+                    udp_socket.sendto(fin, client)
+            except socket.timeout:
+                # nothing arrived, still check for idle flows
+                pass
+
+            # held back acks whose timer ran out
+            now = time.time()
+            while delayed:
+                client, flow = next(iter(delayed.items()))
+                if not flow.acks.due(now):
+                    break
+                send_ack(flow, client, flow.expected_seq_id)
+
+            # resumable flows record their progress
+            if now - last_checkpoint >= args.checkpoint_interval:
+                last_checkpoint = now
+                for flow in flows.values():
+                    if flow.resume is not None:
+                        flow.checkpoint()
+
+            # garbage-collect idle flows
+            if args.multi and now - last_gc >= GC_INTERVAL:
+                last_gc = now
+                for key, flow in list(flows.items()):
+                    if now - flow.last_seen > args.idle_timeout:
+                        flow.close()
+                        del flows[key]
+                        delayed.pop(key, None)
+                        counters[IDLE] += 1
+                        if trace.info:
+                            trace.record(FLOW_CLOSE, key[1], flow.bytes)
+                        print(f"Flow {key} idle, closed -> {flow.output}")
+                for key, closed_at in list(finished.items()):
+                    if now - closed_at > args.idle_timeout:
+                        del finished[key]
+    finally:
+        # finish whatever is still open, also on ctrl-c
+        for flow in flows.values():
+            flow.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stream', action='store_true',
+                        help='write each payload at its offset as it arrives instead of buffering the file')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='output file path')
+    parser.add_argument('--port', type=int, default=RECEIVER_PORT, help='udp port to listen on')
+    parser.add_argument('--max-payload', type=int, default=MAX_PAYLOAD,
+                        help='largest payload agreed to when a sender negotiates, in bytes')
+    parser.add_argument('--sack-blocks', type=int, default=MAX_SACK_BLOCKS,
+                        help='max selective ack blocks per ack, 0 for plain cumulative acks')
+    parser.add_argument('--ack-every', type=int, default=ACK_EVERY,
+                        help='ack every Nth in order packet, gaps and duplicates are still acked at once')
+    parser.add_argument('--ack-delay', type=float, default=ACK_DELAY,
+                        help='seconds an in order packet waits for its ack at most with --ack-every above 1')
+    parser.add_argument('--multi', action='store_true',
+                        help='serve many senders at once, one output file per sender address, never exit')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='directory for per sender files in multi mode')
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                        help='seconds before a silent flow is closed in multi mode')
+    parser.add_argument('--checkpoint-interval', type=float, default=CHECKPOINT_INTERVAL,
+                        help='seconds between received range checkpoints of flows sent with --resume')
+    parser.add_argument('--verbose', action='store_true', help='print every packet and ack')
+    add_trace_arguments(parser, TRACE_PATH)
+    return parser
+
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    trace = tracer_from_args(args)
+
+    # docker stop and kill send SIGTERM, leave through the normal cleanup
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    # create a udp socket
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_socket:
+        # bind the socket to a OS port
+        # bind to 0.0.0.0 so external
+        udp_socket.bind(("0.0.0.0", args.port))
+
+        print("Receiver running")
+        serve(udp_socket, args, trace=trace)
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from receiver import COUNTERS, PACKETS, build_parser, serve
+from tracing import tracer_from_args
+
+# sharded receiver ===================================================
+# N worker processes bind the same port with SO_REUSEPORT, the kernel
+# hashes each sender's address to one worker so a flow never moves.
+# every worker runs the normal receiver loop in multi mode and bumps
+# its own slice of shared counters, the supervisor only reads them.
+
+REPORT_INTERVAL = 5
+
+
+def worker(index, port, args, counters):
+    # supervisor stops workers with SIGTERM, exit through serve's cleanup
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    trace = tracer_from_args(args, f"-{index}")
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_socket:
+        udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        udp_socket.bind(("0.0.0.0", port))
+
+        print(f"Worker {index} running (pid {os.getpid()})")
+        try:
+            serve(udp_socket, args, counters, trace)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # worker processes skip atexit, write the trace here
+            trace.dump()
+
+
+class Supervisor:
+    def __init__(self, workers, port, args):
+        self.port = port
+        self.args = args
+
+        # one counter block per worker, each written by a single process
+        self.counters = [multiprocessing.Array('q', len(COUNTERS), lock=False) for _ in range(workers)]
+        self.processes = [None] * workers
+        self.restarts = 0
+
+    def spawn(self, index):
+        process = multiprocessing.Process(target=worker, args=(index, self.port, self.args, self.counters[index]), daemon=True)
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(len(self.processes)):
+            self.spawn(index)
+
+    # bring back workers that died, the kernel rehashes their senders
+    def check(self):
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                print(f"Worker {index} exited ({process.exitcode}), restarting")
+                self.restarts += 1
+                self.spawn(index)
+
+    def totals(self):
+        return {name: sum(block[field] for block in self.counters) for field, name in enumerate(COUNTERS)}
+
+    def report(self, elapsed, previous):
+        totals = self.totals()
+        rate = (totals['bytes'] - previous['bytes']) / elapsed if elapsed > 0 else 0
+        shares = " ".join(f"{block[PACKETS]}" for block in self.counters)
+        print(f"Receivers: {totals['packets']} packets, {totals['bytes']} bytes ({rate / 1e6:.2f} MB/s), "
+              f"{totals['acks']} acks ({totals['coalesced']} packets coalesced), flows {totals['flows']} opened / {totals['finished']} finished / {totals['idle']} idle, "
+              f"packets per worker [{shares}]")
+        return totals
+
+    def stop(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join()
+
+    def run(self, interval):
+        self.start()
+        previous = self.totals()
+        last = time.time()
+        try:
+            while True:
+                time.sleep(interval)
+                self.check()
+                now = time.time()
+                previous = self.report(now - last, previous)
+                last = now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            print(f"Final: {self.totals()}, {self.restarts} restarts")
+
+
+if __name__ == '__main__':
+    parser = build_parser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='receiver processes sharing the port')
+    parser.add_argument('--report-interval', type=float, default=REPORT_INTERVAL,
+                        help='seconds between aggregated counter reports')
+    args = parser.parse_args()
+
+    # workers always keep per-sender files and keep serving
+    args.multi = True
+
+    print(f"Sharded receiver running, {args.workers} workers on port {args.port}")
+    Supervisor(args.workers, args.port, args).run(args.report_interval)
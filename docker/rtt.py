@@ -0,0 +1,46 @@
+# adaptive retransmission timeout ====================================
+# smoothed rtt and rtt variance as in RFC 6298, the emulated path is
+# ~100ms plus queueing so a fixed 1-2s timeout stalls every loss.
+# callers follow Karn's rule: never sample a packet that was resent,
+# and keep the backed off timeout until a clean sample comes back.
+
+INITIAL_RTO = 1.0
+MIN_RTO = 0.2
+MAX_RTO = 60.0
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+CLOCK_GRANULARITY = 0.001
+
+
+class RttEstimator:
+    def __init__(self, initialRto=INITIAL_RTO, minRto=MIN_RTO, maxRto=MAX_RTO):
+        self.minRto = minRto
+        self.maxRto = maxRto
+        self.srtt = None
+        self.rttvar = None
+        self.baseRto = initialRto
+        self.backoff = 1
+
+    # timeout to arm right now, including any backoff
+    @property
+    def rto(self):
+        return min(self.baseRto * self.backoff, self.maxRto)
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+
+        self.baseRto = min(max(self.srtt + max(CLOCK_GRANULARITY, K * self.rttvar), self.minRto), self.maxRto)
+
+        # a clean sample ends the backoff
+        self.backoff = 1
+
+    # exponential backoff on every consecutive timeout
+    def on_timeout(self):
+        if self.baseRto * self.backoff < self.maxRto:
+            self.backoff *= 2
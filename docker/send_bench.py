@@ -0,0 +1,74 @@
+import argparse
+import os
+import socket
+import tempfile
+import time
+
+from protocol import SEQ_ID_SIZE
+from transport import MESSAGE_SIZE, Transport
+
+# sender micro-benchmark =============================================
+# packets per second through the send path alone, no receiver logic:
+# datagrams go to a loopback socket nobody reads (the kernel drops what
+# does not fit, the sender pays the same). each mode sends every packet
+# twice, a first pass and a resend pass, the way a lossy run would.
+#   concat   the old path, int.to_bytes(...) + payload copied per send
+#   sendmsg  cached header and a view of the payload, one send each
+#   gso      the same buffers, a window's run of packets per send
+
+MODES = ("concat", "sendmsg", "gso")
+PACKETS = 100000
+WINDOW = 64  # packets queued between flushes, like one send_window
+REPEAT = 3
+
+
+def concat_pass(sock, packets, address, messageSize, count):
+    for index in range(count):
+        sock.sendto(int.to_bytes(index * messageSize, SEQ_ID_SIZE, byteorder="big", signed=True) + packets[index], address)
+
+
+def transport_pass(transport, count):
+    for index in range(count):
+        transport.queue_packet(transport.header(index), transport.packets[index])
+        if index % WINDOW == WINDOW - 1:
+            transport.flush()
+    transport.flush()
+
+
+# best of repeat runs of (first pass, resend pass) in packets per second
+def measure(mode, path, address, messageSize, count, repeat):
+    best = [0, 0]
+    for _ in range(repeat):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            transport = Transport(None, path, address, messageSize=messageSize, gso=mode == "gso")
+            transport.socket = sock
+            for i in range(2):
+                start = time.perf_counter()
+                if mode == "concat":
+                    concat_pass(sock, transport.packets, address, messageSize, count)
+                else:
+                    transport_pass(transport, count)
+                best[i] = max(best[i], count / (time.perf_counter() - start))
+            transport.packets.close()
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packets", type=int, default=PACKETS, help="packets per pass")
+    parser.add_argument("--payload", type=int, default=MESSAGE_SIZE, help="payload bytes per packet")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per mode, the best is kept")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated, from: " + ", ".join(MODES))
+    args = parser.parse_args()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sink, tempfile.TemporaryDirectory() as workdir:
+        sink.bind(("127.0.0.1", 0))
+        path = os.path.join(workdir, "payload.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(args.packets * args.payload))
+
+        print(f"{args.packets} packets of {args.payload} bytes to {sink.getsockname()}, best of {args.repeat}")
+        print(f"{'mode':<10}{'first (pkt/s)':>16}{'resend (pkt/s)':>16}")
+        for mode in args.modes.split(","):
+            first, resend = measure(mode, path, sink.getsockname(), args.payload, args.packets, args.repeat)
+            print(f"{mode:<10}{first:>16.0f}{resend:>16.0f}")
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+
+from async_transport import AsyncTransport, run_transfers
+from congestion import Bbr, Cubic, FixedWindow, Reno, Tahoe
+from tracing import add_trace_arguments, tracer_from_args
+from protocol import header_size
+from transport import (
+    FILE_PATH, GO_BACK_N, MESSAGE_SIZE, SELECTIVE, SERVER_ADDRESS, TRACE_PATH, choose_payload, choose_wide, fec_block,
+    print_metrics,
+)
+
+# one process, many concurrent transfers on the asyncio runtime.
+# every flow has its own socket (source port) and controller; point them
+# at a receiver that keeps per-sender state when running more than one.
+CONTROLLERS = {
+    "fixed": lambda: FixedWindow(25),
+    "tahoe": lambda: Tahoe(1, 64, 25),
+    "reno": lambda: Reno(1, 64, 25),
+    "cubic": lambda: Cubic(),
+    "bbr": lambda: Bbr(),
+}
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--algorithm", choices=sorted(CONTROLLERS), default="reno")
+parser.add_argument("--flows", type=int, default=1, help="concurrent transfers")
+parser.add_argument("--file", default=FILE_PATH, help="file to send")
+parser.add_argument("--host", default=SERVER_ADDRESS[0], help="receiver address")
+parser.add_argument("--port", type=int, default=SERVER_ADDRESS[1], help="receiver port")
+parser.add_argument("--go-back-n", action="store_true", help="rewind the window on timeout instead of selective resend")
+parser.add_argument("--pace", action="store_true", help="spread each window over the rtt instead of bursting it")
+parser.add_argument("--payload", help="negotiate a payload size with the receiver, bytes or 'mtu'")
+parser.add_argument("--fec", type=fec_block, default=0, help="send parity after every N packets, 0 for no fec")
+parser.add_argument("--verbose", action="store_true", help="print every packet and ack")
+add_trace_arguments(parser, TRACE_PATH)
+args = parser.parse_args()
+
+wide = choose_wide((args.host, args.port), args.file)
+messageSize = choose_payload((args.host, args.port), args.payload, header_size(wide)) if args.payload else MESSAGE_SIZE
+
+transports = [
+    AsyncTransport(
+        CONTROLLERS[args.algorithm](),
+        path=args.file,
+        address=(args.host, args.port),
+        retransmit=GO_BACK_N if args.go_back_n else SELECTIVE,
+        pacing=args.pace,
+        fec=args.fec or None,
+        messageSize=messageSize,
+        wide=wide,
+        verbose=args.verbose,
+        trace=tracer_from_args(args, f"-{flow}" if args.flows > 1 else ""),
+    )
+    for flow in range(args.flows)
+]
+print(f"Total packets to send: {transports[0].count} x {args.flows} flows")
+
+for flow, stats in enumerate(asyncio.run(run_transfers(transports))):
+    print(f"\n--- flow {flow} ({stats['algorithm']}) ---")
+    print_metrics(stats)
@@ -0,0 +1,13 @@
+from congestion import Bbr
+from transport import SELECTIVE, run_sender, tunable
+
+# BBR specific constants
+INITIAL_CWND = tunable("INITIAL_CWND", 10)
+TIMEOUT = tunable("TIMEOUT", 1)  # only until the first rtt sample, then adaptive
+MAX_WINDOW_SIZE = tunable("MAX_WINDOW_SIZE", None)  # inflight is capped by the bandwidth-delay estimate
+
+run_sender(
+    Bbr(INITIAL_CWND, maxWindow=MAX_WINDOW_SIZE),
+    retransmit=SELECTIVE,
+    initialRto=TIMEOUT,
+)
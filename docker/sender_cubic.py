@@ -0,0 +1,14 @@
+from congestion import Cubic
+from transport import SELECTIVE, run_sender, tunable
+
+# CUBIC specific constants
+INITIAL_CWND = tunable("INITIAL_CWND", 1)
+INITIAL_SSTHRESH = tunable("INITIAL_SSTHRESH", 64)
+TIMEOUT = tunable("TIMEOUT", 1)  # only until the first rtt sample, then adaptive
+MAX_WINDOW_SIZE = tunable("MAX_WINDOW_SIZE", None)  # no cap, the cubic curve does the probing
+
+run_sender(
+    Cubic(INITIAL_CWND, INITIAL_SSTHRESH, MAX_WINDOW_SIZE),
+    retransmit=SELECTIVE,
+    initialRto=TIMEOUT,
+)
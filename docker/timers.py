@@ -0,0 +1,58 @@
+import heapq
+
+# retransmission timers ==============================================
+# one heap ordered by deadline, cancel and re-arm are O(1) by only
+# touching the dict, stale heap entries get dropped when they surface.
+# only packets whose deadline actually passed are ever looked at.
+
+
+class DeadlineHeap:
+    def __init__(self):
+        self._heap = []
+        self._deadline = {}  # key -> live deadline
+
+    def __len__(self):
+        return len(self._deadline)
+
+    def __contains__(self, key):
+        return key in self._deadline
+
+    # arm or re-arm the timer for key
+    def schedule(self, key, deadline):
+        self._deadline[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+
+        # mostly stale entries, rebuild from the live ones
+        if len(self._heap) > 2 * len(self._deadline) + 64:
+            self._heap = [(d, k) for k, d in self._deadline.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, key):
+        self._deadline.pop(key, None)
+
+    def clear(self):
+        self._heap.clear()
+        self._deadline.clear()
+
+    # drop heap entries that were cancelled or re-armed since
+    def _prune(self):
+        heap = self._heap
+        while heap and self._deadline.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    # earliest live deadline, None when nothing is armed
+    def next_deadline(self):
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    # disarm and return every key whose deadline is at or before now
+    def expired(self, now):
+        keys = []
+        heap = self._heap
+        self._prune()
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            del self._deadline[key]
+            keys.append(key)
+            self._prune()
+        return keys
@@ -0,0 +1,171 @@
+import atexit
+import json
+import signal
+import struct
+import sys
+import time
+from array import array
+
+# event tracing ======================================================
+# printing every packet costs more than sending it, so the hot paths
+# record fixed size events into a preallocated ring instead. call sites
+# guard on a plain attribute (`if trace.debug:`), so with tracing off an
+# event costs one attribute load. the ring keeps the last `capacity`
+# events and is written out on exit or on SIGUSR1, as JSONL or as
+# packed binary records (`python tracing.py file.bin` converts those).
+
+OFF, ERROR, INFO, DEBUG = range(4)
+LEVELS = {"off": OFF, "error": ERROR, "info": INFO, "debug": DEBUG}
+
+TRACE_CAPACITY = 1 << 16
+
+# event kinds, what a/b/c hold for each, and the level they belong to
+SEND, RESEND, ACK, PROGRESS, DUPACK, FAST_RETRANSMIT, TIMEOUT, CWND, FIN, RECV, ACK_SENT, FLOW_OPEN, FLOW_CLOSE, REPAIR = range(14)
+EVENTS = {
+    SEND: ("send", ("index", "seq", "cwnd"), DEBUG),
+    RESEND: ("resend", ("index", "seq", "cwnd"), DEBUG),
+    ACK: ("ack", ("ack", "blocks", "cwnd"), DEBUG),
+    PROGRESS: ("progress", ("from", "to", "cwnd"), DEBUG),
+    DUPACK: ("dupack", ("count", "base", "cwnd"), INFO),
+    FAST_RETRANSMIT: ("fast_retransmit", ("base", "highest", "cwnd"), INFO),
+    TIMEOUT: ("timeout", ("base", "next", "rto"), INFO),
+    CWND: ("cwnd", ("inflight", "base", "cwnd"), INFO),
+    FIN: ("fin", ("seq", "packets", "time"), INFO),
+    RECV: ("recv", ("seq", "length", None), DEBUG),
+    ACK_SENT: ("ack_sent", ("ack", "blocks", None), DEBUG),
+    FLOW_OPEN: ("flow_open", ("port", "flows", None), INFO),
+    FLOW_CLOSE: ("flow_close", ("port", "bytes", None), INFO),
+    REPAIR: ("repair", ("seq", "length", None), INFO),
+}
+
+# binary dump: magic, then one record per event
+MAGIC = b"TRC1"
+RECORD = struct.Struct("<dBqqd")
+
+# tracers dumped together on SIGUSR1
+INSTALLED = []
+
+
+class Tracer:
+    def __init__(self, level=OFF, capacity=TRACE_CAPACITY, path=None, echo=False):
+        self.level = level
+        self.error = level >= ERROR
+        self.info = level >= INFO
+        self.debug = level >= DEBUG
+        self.path = path
+        self.echo = echo
+
+        # parallel fixed arrays, nothing is allocated per event
+        self.capacity = capacity if level > OFF else 1
+        self.times = array("d", bytes(8 * self.capacity))
+        self.kinds = array("B", bytes(self.capacity))
+        self.a = array("q", bytes(8 * self.capacity))
+        self.b = array("q", bytes(8 * self.capacity))
+        self.c = array("d", bytes(8 * self.capacity))
+        self.head = 0
+        self.total = 0
+
+    def record(self, kind, a=0, b=0, c=0.0, now=None):
+        i = self.head
+        self.times[i] = time.time() if now is None else now
+        self.kinds[i] = kind
+        self.a[i] = a
+        self.b[i] = b
+        self.c[i] = c
+        self.head = (i + 1) % self.capacity
+        self.total += 1
+        if self.echo:
+            print(format_event(self.event(i)))
+
+    def event(self, i):
+        return (self.times[i], self.kinds[i], self.a[i], self.b[i], self.c[i])
+
+    # events still in the ring, oldest first
+    def events(self):
+        if self.total < self.capacity:
+            indices = range(self.total)
+        else:
+            indices = list(range(self.head, self.capacity)) + list(range(self.head))
+        for i in indices:
+            yield self.event(i)
+
+    def dump(self, path=None):
+        path = path or self.path
+        if path is None or self.total == 0:
+            return
+        if path.endswith(".jsonl"):
+            with open(path, "w") as f:
+                for event in self.events():
+                    f.write(json.dumps(event_dict(event)) + "\n")
+        else:
+            with open(path, "wb") as f:
+                f.write(MAGIC)
+                for event in self.events():
+                    f.write(RECORD.pack(*event))
+
+    # dump when the process exits, and on demand with SIGUSR1
+    def install(self):
+        if self.level == OFF or self.path is None:
+            return
+        atexit.register(self.dump)
+        if not INSTALLED and hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, dump_installed)
+        INSTALLED.append(self)
+
+
+def dump_installed(signum=None, frame=None):
+    for tracer in INSTALLED:
+        tracer.dump()
+
+
+def event_dict(event):
+    t, kind, a, b, c = event
+    name, fields, _ = EVENTS[kind]
+    event = {"t": t, "event": name}
+    for field, value in zip(fields, (a, b, c)):
+        if field is not None:
+            event[field] = value
+    return event
+
+
+def format_event(event):
+    t, kind, a, b, c = event
+    name, fields, _ = EVENTS[kind]
+    values = " ".join(f"{field}={value}" for field, value in zip(fields, (a, b, c)) if field is not None)
+    return f"{t:.6f} {name} {values}"
+
+
+def read_binary(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a binary trace")
+    return list(RECORD.iter_unpack(data[len(MAGIC) :]))
+
+
+# shared command line options for the senders and the receiver
+def add_trace_arguments(parser, defaultPath):
+    parser.add_argument("--trace", choices=list(LEVELS), default="off", help="event trace level kept in memory")
+    parser.add_argument("--trace-file", default=defaultPath,
+                        help="where the trace is written on exit, .jsonl for text, anything else for binary")
+    parser.add_argument("--trace-size", type=int, default=TRACE_CAPACITY, help="events kept in the ring")
+
+
+# --verbose echoes every event as it happens, like the old prints
+def tracer_from_args(args, suffix=""):
+    verbose = getattr(args, "verbose", False)
+    level = DEBUG if verbose else LEVELS[args.trace]
+
+    # echo only, unless a trace level was asked for as well
+    path = args.trace_file if args.trace != "off" else None
+    if suffix and path:
+        stem, dot, ext = path.rpartition(".")
+        path = f"{stem}{suffix}.{ext}" if dot else path + suffix
+    tracer = Tracer(level, args.trace_size, path, echo=verbose)
+    tracer.install()
+    return tracer
+
+
+if __name__ == "__main__":
+    for event in read_binary(sys.argv[1]):
+        print(json.dumps(event_dict(event)))
@@ -0,0 +1,790 @@
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import time
+
+from delay_stats import DelayStats
+from fec import FEC_MAX_BLOCK, FecEncoder
+from pacing import TokenBucket
+from payload_source import PayloadSource
+from protocol import (
+    LEGACY_VERSION, MAX_DATAGRAM, MAX_SEQ_OFFSET, SEQ_ID_SIZE, WIDE_VERSION,
+    header_size, pack_header, pack_resume_request, pack_size_request, pack_version_request,
+    unpack_ack, unpack_resume_reply, unpack_sack_blocks, unpack_size_reply, unpack_version_reply,
+)
+from rtt import RttEstimator
+from timers import DeadlineHeap
+from tracing import (
+    ACK, CWND, DEBUG, DUPACK, FAST_RETRANSMIT, FIN, OFF, PROGRESS, RESEND, SEND, TIMEOUT,
+    Tracer, add_trace_arguments, tracer_from_args,
+)
+
+PACKET_SIZE = 1024
+MESSAGE_SIZE = PACKET_SIZE - SEQ_ID_SIZE
+SERVER_ADDRESS = ("127.0.0.1", 5001)
+FILE_PATH = "file.mp3"
+
+# payload negotiation, a receiver that never answers gets MESSAGE_SIZE
+NEGOTIATE_TIMEOUT = 0.5
+NEGOTIATE_ATTEMPTS = 3
+
+# a file is recognised on resume by its size and a hash of both ends
+FILE_ID_SAMPLE = 64 * 1024
+
+# linux socket options python does not name
+IP_MTU_DISCOVER = getattr(socket, "IP_MTU_DISCOVER", 10)
+IP_PMTUDISC_DO = getattr(socket, "IP_PMTUDISC_DO", 2)
+IP_MTU = getattr(socket, "IP_MTU", 14)
+IP_UDP_HEADERS = 20 + 8
+
+# udp generic segmentation offload (linux 4.18+): one sendmsg carries a
+# run of equal sized datagrams and the kernel splits them, the last one
+# may be shorter. 64 segments and one udp length field per send at most
+SOL_UDP = getattr(socket, "SOL_UDP", 17)
+UDP_SEGMENT = getattr(socket, "UDP_SEGMENT", 103)
+GSO_SIZE = struct.Struct("=H")
+GSO_MAX_SEGMENTS = 64
+GSO_MAX_BYTES = 65000
+TRACE_PATH = "sender-trace.jsonl"
+
+# retransmission styles ==============================================
+# selective: only the packet whose timer ran out is sent again
+# go-back-n: any timeout rewinds to the oldest unacked packet and the
+#            window is sent again through the normal send loop
+SELECTIVE = "selective"
+GO_BACK_N = "go-back-n"
+
+# sender constants can be overridden from the environment, so tune.py
+# can search over them without editing the scripts: SENDER_TIMEOUT=0.5
+TUNABLE_PREFIX = "SENDER_"
+
+# window based controllers pace at cwnd/srtt times this, a little
+# above the window rate so pacing never becomes the bottleneck
+PACING_GAIN = 1.25
+
+# a hole is lost once this many sacked packets sit above it (RFC 6675
+# IsLost), fewer may just be reordering or still in flight
+DUP_THRESH = 3
+
+
+# transport core =====================================================
+# one send/ack loop for every sender. it owns the socket, packetizing,
+# in-flight tracking, sack bookkeeping and timers; the congestion
+# controller (congestion.py) only sizes the window.
+#
+# 2 ID format, same as the scripts:
+# a. index ID, packet / window index
+# b. size ID, index * messageSize, what goes on the wire
+#
+# messageSize is MESSAGE_SIZE unless the sender negotiated another one
+
+
+class Transport:
+    def __init__(
+        self,
+        controller,
+        path=FILE_PATH,
+        address=SERVER_ADDRESS,
+        retransmit=SELECTIVE,
+        selectiveAck=True,
+        initialRto=1,
+        pacing=False,
+        verbose=False,
+        trace=None,
+        fec=None,
+        messageSize=MESSAGE_SIZE,
+        gso=True,
+        resume=False,
+        wide=False,
+    ):
+        self.controller = controller
+        self.address = address
+        self.retransmit = retransmit
+        self.selectiveAck = selectiveAck
+        self.pacing = pacing
+        self.verbose = verbose
+
+        # per packet events go to the trace ring, not stdout
+        self.trace = trace if trace is not None else Tracer(DEBUG if verbose else OFF, echo=verbose)
+        self.tracedCwnd = None
+
+        self.messageSize = messageSize
+        self.path = path
+        self.packets = PayloadSource(path, messageSize)
+        self.count = len(self.packets)
+
+        # 8 byte offsets (protocol version 2), needed past 2 GiB
+        self.wide = wide
+        self.headerSize = header_size(wide)
+        if not wide and self.packets.size > MAX_SEQ_OFFSET:
+            raise ValueError(f"{path} is over 2 GiB, 4 byte offsets cannot address it")
+        self.socket = None
+        self.startTime = None
+
+        # headers are built once per packet and kept until it is acked, a
+        # resend is the cached header plus a view into the mapped file
+        self.headers = {}  # index -> packed size seq id
+
+        # data packets queued for one gso send, flushed before every wait
+        self.gsoSegments = min(GSO_MAX_SEGMENTS, GSO_MAX_BYTES // (self.headerSize + messageSize)) if gso else 0
+        self.gsoControl = [(SOL_UDP, UDP_SEGMENT, GSO_SIZE.pack(self.headerSize + messageSize))]
+        self.batch = []  # header, payload, header, payload, ...
+        self.sends = 0
+
+        # window state
+        self.baseIndex = 0  # oldest packet not cumulatively acked
+        self.nextIndex = 0  # next packet the send loop will put out
+        self.highestSent = 0  # one past the highest index ever sent
+        self.sacked = set()  # indices above baseIndex the receiver reported
+        self.recoveryPoint = None  # highestSent when fast retransmit started
+        self.recoveryResent = set()
+
+        # timers and rtt
+        self.sentTime = {}  # index -> last send time
+        self.firstSent = {}  # index -> first send time, resent packets dropped (Karn)
+        self.timers = DeadlineHeap()
+        self.rtt = RttEstimator(initialRto=initialRto)
+
+        # delivery rate, packets delivered so far and when the last one was
+        self.delivered = 0
+        self.deliveredTime = 0.0
+        self.sendState = {}  # index -> (delivered, deliveredTime) at send
+
+        # pacing, new packets leave only with a token
+        self.pacer = TokenBucket()
+
+        # forward error correction, parity after every `fec` new packets
+        self.fec = FecEncoder(fec, messageSize, wide=wide) if fec else None
+        self.holeScan = 0  # sack holes below this index are counted
+        self.holeResent = set()  # holes at or above holeScan resent as lost
+
+        # ack state
+        self.lastAckId = 0  # nothing acked yet is the same as acking byte 0
+        self.dupAcks = 0
+
+        # --resume: packets the receiver kept from an earlier run, moved
+        # into sacked as the window reaches them and never sent
+        self.resume = resume
+        self.resumed = set()
+        self.resumedBytes = 0
+
+        # metrics
+        self.totalRetransmission = 0
+        self.delays = DelayStats()
+        self.ackBatches = 0
+        self.ackBatchTotal = 0
+        self.ackBatchMax = 0
+
+    # rare messages only, per packet events go through self.trace
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def trace_cwnd(self, now):
+        cwnd = self.controller.cwnd
+        if cwnd != self.tracedCwnd:
+            self.tracedCwnd = cwnd
+            self.trace.record(CWND, self.inflight, self.baseIndex, cwnd, now)
+
+    # packets between baseIndex and nextIndex the receiver does not have yet
+    @property
+    def inflight(self):
+        return self.nextIndex - self.baseIndex - len(self.sacked)
+
+    # send ---------------------------------------------------------------
+    def send_packet(self, index, now):
+        sizeSeqId = index * self.messageSize
+        self.queue_packet(self.header(index), self.packets[index])
+
+        if index < self.highestSent:
+            # Karn's rule, no rtt sample from a resent packet
+            self.firstSent.pop(index, None)
+            self.totalRetransmission += 1
+            if self.trace.debug:
+                self.trace.record(RESEND, index, sizeSeqId, self.controller.cwnd, now)
+        else:
+            self.firstSent[index] = now
+            self.highestSent = index + 1
+            if self.trace.debug:
+                self.trace.record(SEND, index, sizeSeqId, self.controller.cwnd, now)
+            if self.fec is not None:
+                for parity in self.fec.add(index, self.packets[index], index == self.count - 1):
+                    self.send_datagram(parity)
+
+        self.sentTime[index] = now
+        self.sendState[index] = (self.delivered, self.deliveredTime)
+        self.timers.schedule(index, now + self.rtt.rto)
+
+    def header(self, index):
+        header = self.headers.get(index)
+        if header is None:
+            header = self.headers[index] = pack_header(index * self.messageSize, self.wide)
+        return header
+
+    # controller's own rate, or cwnd spread over the smoothed rtt when pacing
+    def pacing_rate(self):
+        if self.controller.pacing_rate:
+            return self.controller.pacing_rate
+        if self.pacing and self.rtt.srtt:
+            return PACING_GAIN * max(1, self.controller.cwnd) / self.rtt.srtt
+        return None
+
+    # control and parity datagrams, queued data goes first to keep the order
+    def send_datagram(self, data):
+        self.flush()
+        self.socket.sendto(data, self.address)
+        self.sends += 1
+
+    # header and payload leave as separate buffers, nothing is joined
+    def send_parts(self, header, payload):
+        self.socket.sendmsg((header, payload), (), 0, self.address)
+        self.sends += 1
+
+    def queue_packet(self, header, payload):
+        if self.gsoSegments < 2:
+            self.send_parts(header, payload)
+            return
+        self.batch.append(header)
+        self.batch.append(payload)
+
+        # only the last segment of a send may be short
+        if len(payload) < self.messageSize or len(self.batch) >= 2 * self.gsoSegments:
+            self.flush()
+
+    def flush(self):
+        batch = self.batch
+        if not batch:
+            return
+        if len(batch) == 2:
+            self.send_parts(batch[0], batch[1])
+        else:
+            try:
+                self.socket.sendmsg(batch, self.gsoControl, 0, self.address)
+                self.sends += 1
+            except OSError as e:
+                # kernel or device without udp gso, one datagram per send from now on
+                self.log(f"GSO unavailable ({e}), sending packets one by one")
+                self.gsoSegments = 0
+                for i in range(0, len(batch), 2):
+                    self.send_parts(batch[i], batch[i + 1])
+        batch.clear()
+
+    def send_window(self, now):
+        self.pacer.set_rate(self.pacing_rate(), now)
+        while self.can_send():
+            if self.nextIndex in self.resumed:
+                self.resumed.discard(self.nextIndex)
+                self.sacked.add(self.nextIndex)
+                self.nextIndex += 1
+                continue
+            if not self.pacer.consume(now):
+                break
+            # already received out of order, nothing to resend
+            if self.nextIndex not in self.sacked:
+                self.send_packet(self.nextIndex, now)
+            self.nextIndex += 1
+
+    # window has room for a new packet
+    def can_send(self):
+        window = max(1, int(self.controller.cwnd))
+        return self.nextIndex < self.baseIndex + window and self.nextIndex < self.count
+
+    # resend every hole the sacks show lost once per recovery. with
+    # nothing sacked the duplicate or partial ack is the only evidence,
+    # and only the oldest packet goes
+    def resend_holes(self, now):
+        top = self.lost_below() if self.sacked else self.baseIndex + 1
+        for index in range(self.baseIndex, min(top, self.highestSent)):
+            if index not in self.sacked and index not in self.recoveryResent:
+                self.resend_lost(index, now)
+                self.recoveryResent.add(index)
+
+    # a resend of a packet the acks show lost, the fec loss estimate
+    # counts it. a timeout alone may be spurious and is not counted
+    def resend_lost(self, index, now):
+        self.send_packet(index, now)
+        if self.fec is not None and index >= self.holeScan:
+            self.holeResent.add(index)
+
+    def fast_retransmit(self, now):
+        if self.trace.info:
+            self.trace.record(FAST_RETRANSMIT, self.baseIndex, self.highestSent, self.controller.cwnd, now)
+        # with sacks even a go-back-n sender knows the holes, it rewinds
+        # only on timeout
+        if self.retransmit == GO_BACK_N and not self.selectiveAck:
+            self.nextIndex = self.baseIndex
+            return
+        self.recoveryPoint = self.highestSent
+        self.recoveryResent.clear()
+        # the duplicate acks already mark the oldest packet lost
+        if self.baseIndex < self.highestSent and self.baseIndex not in self.sacked:
+            self.resend_lost(self.baseIndex, now)
+            self.recoveryResent.add(self.baseIndex)
+        self.resend_holes(now)
+
+    # ack ------------------------------------------------------------------
+    # every ack waiting on the socket, without blocking
+    def receive_acks(self):
+        acks = []
+        while True:
+            try:
+                ack, _ = self.socket.recvfrom(PACKET_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            acks.append(ack)
+        self.count_batch(len(acks))
+        return acks
+
+    def count_batch(self, size):
+        if size:
+            self.ackBatches += 1
+            self.ackBatchTotal += size
+            self.ackBatchMax = max(self.ackBatchMax, size)
+
+    # a batch of acks collapses to the highest cumulative ack, the union
+    # of their sack blocks and a duplicate count; state updates once
+    def handle_acks(self, acks, now):
+        sizeAckId = None
+        dupCount = 0
+        blocks = []
+        for ack in acks:
+            ackId, headerSize = unpack_ack(ack)
+            if ack[headerSize : headerSize + 3] == b"fin":
+                continue
+            if self.trace.debug:
+                self.trace.record(ACK, ackId, len(unpack_sack_blocks(ack, headerSize)), self.controller.cwnd, now)
+            if sizeAckId is None or ackId > sizeAckId:
+                sizeAckId = ackId
+                dupCount = 0
+            elif ackId == sizeAckId:
+                dupCount += 1
+            if self.selectiveAck:
+                blocks.extend(unpack_sack_blocks(ack, headerSize))
+        if sizeAckId is None:
+            return
+
+        # ack is the next byte wanted, everything before this index is done
+        ackIndex = self.packets_within(0, sizeAckId)[1]
+
+        # packets this batch reports for the first time
+        covered = []
+
+        for start, end in blocks:
+            first, last = self.packets_within(start, end)
+            first = max(first, ackIndex)
+            last = min(last, self.highestSent)
+            for index in range(first, last):
+                if index not in self.sacked:
+                    self.sacked.add(index)
+                    covered.append(index)
+
+        if self.fec is not None:
+            self.scan_holes(ackIndex)
+
+        advanced = sizeAckId > self.lastAckId and ackIndex > self.baseIndex
+        if advanced:
+            for index in range(self.baseIndex, ackIndex):
+                if index in self.sacked:
+                    self.sacked.discard(index)
+                else:
+                    covered.append(index)
+
+            if self.trace.debug:
+                self.trace.record(PROGRESS, self.baseIndex, ackIndex, self.controller.cwnd, now)
+            self.baseIndex = ackIndex
+            self.nextIndex = max(self.nextIndex, self.baseIndex)
+            self.lastAckId = sizeAckId
+            self.dupAcks = 0
+        elif sizeAckId == self.lastAckId:
+            # the first copy of an old ack is a duplicate too
+            dupCount += 1
+        else:
+            # reordered, older than what we already have
+            dupCount = 0
+
+        # each packet gives one rtt sample, the first time an ack covers it
+        newestStamp = None
+        newestSent = None
+        newestState = None
+        for index in covered:
+            self.timers.cancel(index)
+            self.headers.pop(index, None)
+            stamp = self.firstSent.pop(index, None)
+            if stamp is not None and (newestStamp is None or stamp > newestStamp):
+                newestStamp = stamp
+            sent = self.sentTime.pop(index, None)
+            sendState = self.sendState.pop(index, None)
+            if sent is not None and (newestSent is None or sent > newestSent):
+                newestSent = sent
+                newestState = sendState
+
+        # rtt sample from the newest packet this batch covers
+        rttSample = None
+        if newestStamp is not None:
+            rttSample = now - newestStamp
+            self.rtt.sample(rttSample)
+
+        # delay and jitter of the newest packet this batch covers
+        if newestSent is not None:
+            self.delays.add(now - newestSent)
+
+        # delivery rate since the newest covered packet went out
+        if covered:
+            self.delivered += len(covered)
+            self.deliveredTime = now
+            if newestState is not None:
+                priorDelivered, priorTime = newestState
+                deliveryRate = (self.delivered - priorDelivered) / max(now - priorTime, 1e-6)
+                self.controller.on_delivery(self.delivered, priorDelivered, deliveryRate, rttSample, self.inflight, now)
+
+        if advanced:
+            self.controller.on_ack(len(covered), rttSample, now)
+
+            # partial ack during recovery, the new oldest packet is a hole too
+            if self.recoveryPoint is not None:
+                if self.baseIndex >= self.recoveryPoint:
+                    self.recoveryPoint = None
+                    self.recoveryResent.clear()
+                else:
+                    self.resend_holes(now)
+
+        # controllers count duplicates one at a time (3 = fast retransmit)
+        for _ in range(dupCount):
+            self.dupAcks += 1
+            if self.trace.info:
+                self.trace.record(DUPACK, self.dupAcks, self.baseIndex, self.controller.cwnd, now)
+            if self.controller.on_dupack(self.dupAcks, now):
+                self.fast_retransmit(now)
+
+        if self.trace.info:
+            self.trace_cwnd(now)
+
+    # [first, last) packet indices wholly inside the byte range [start, end)
+    def packets_within(self, start, end):
+        first = -(-start // self.messageSize)
+        last = self.count if end >= self.packets.size else end // self.messageSize
+        return first, max(first, last)
+
+    # holes below this index have DUP_THRESH sacked packets above them
+    def lost_below(self):
+        if len(self.sacked) < DUP_THRESH:
+            return self.baseIndex
+        return heapq.nlargest(DUP_THRESH, self.sacked)[-1]
+
+    # loss the fec level follows: a hole counts as lost once the sacks
+    # show it lost or it is resent as lost, each index is looked at once
+    # when it is decided, late and in-order deliveries count as clean
+    def scan_holes(self, ackIndex):
+        start = max(self.holeScan, self.baseIndex)
+        top = max(ackIndex, self.lost_below())
+        if top <= start:
+            return
+        missing = 0
+        for index in range(start, top):
+            if index in self.holeResent or (index >= ackIndex and index not in self.sacked):
+                missing += 1
+        self.fec.on_loss_sample(missing, top - start)
+        self.holeScan = top
+        self.holeResent = {index for index in self.holeResent if index >= top}
+
+    # timeout --------------------------------------------------------------
+    def handle_timeouts(self, now):
+        expired = [index for index in self.timers.expired(now) if index >= self.baseIndex and index not in self.sacked]
+        if not expired:
+            return
+
+        if self.retransmit == GO_BACK_N:
+            # the window is gone, rewind and let the send loop resend it
+            if self.trace.info:
+                self.trace.record(TIMEOUT, self.baseIndex, self.nextIndex, self.rtt.rto, now)
+            self.rtt.on_timeout()
+            self.controller.on_timeout(now)
+            if self.trace.info:
+                self.trace_cwnd(now)
+            self.timers.clear()
+            self.dupAcks = 0
+            self.recoveryPoint = None
+            self.recoveryResent.clear()
+            self.nextIndex = self.baseIndex
+            return
+
+        # back off once per loss of the oldest packet, not once per expiry
+        if self.baseIndex in expired:
+            if self.trace.info:
+                self.trace.record(TIMEOUT, self.baseIndex, self.nextIndex, self.rtt.rto, now)
+            self.rtt.on_timeout()
+            self.controller.on_timeout(now)
+            if self.trace.info:
+                self.trace_cwnd(now)
+            self.dupAcks = 0
+            self.recoveryPoint = None
+            self.recoveryResent.clear()
+
+        # expired holes below a sacked packet are lost, not just slow
+        sackTop = max(self.sacked, default=-1)
+        for index in expired:
+            if index < sackTop:
+                self.resend_lost(index, now)
+            else:
+                self.send_packet(index, now)
+
+    # main loop ------------------------------------------------------------
+    @property
+    def done(self):
+        return self.baseIndex >= self.count
+
+    def start(self, now):
+        self.startTime = now
+        self.deliveredTime = now
+
+    # seconds until something is due: the next retransmit or pacer token
+    def wait_time(self, now):
+        nextDeadline = self.timers.next_deadline()
+        waitTime = self.rtt.rto if nextDeadline is None else max(0, nextDeadline - now)
+        if self.pacer.rate and self.can_send():
+            waitTime = min(waitTime, self.pacer.wait_time(now))
+        return waitTime
+
+    # resume -------------------------------------------------------------
+    # ask from the data socket, the receiver keys flows by address
+    def request_resume(self, timeout=NEGOTIATE_TIMEOUT, attempts=NEGOTIATE_ATTEMPTS):
+        request = pack_resume_request(self.packets.size, file_id(self.path))
+        for _ in range(attempts):
+            self.send_datagram(request)
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                received, _, _ = select.select([self.socket], [], [], max(0, deadline - time.time()))
+                if not received:
+                    break
+                reply, _ = self.socket.recvfrom(MAX_DATAGRAM)
+                ranges = unpack_resume_reply(reply)
+                if ranges is not None:
+                    return ranges
+        self.log("No resume reply, sending the whole file")
+        return []
+
+    # packets wholly inside the ranges the receiver holds are skipped
+    def skip_delivered(self, ranges):
+        for start, end in ranges:
+            first, last = self.packets_within(start, end)
+            self.resumed.update(range(first, last))
+        self.resumedBytes = sum(len(self.packets[index]) for index in self.resumed)
+
+        while self.baseIndex in self.resumed:
+            self.resumed.discard(self.baseIndex)
+            self.baseIndex += 1
+        self.nextIndex = self.highestSent = self.baseIndex
+        self.lastAckId = min(self.baseIndex * self.messageSize, self.packets.size)
+
+    # send end signal
+    def finish(self, now):
+        finPacket = int.to_bytes(-1, SEQ_ID_SIZE, byteorder="big", signed=True) + b"==FINACK=="
+        self.send_datagram(finPacket)
+        if self.trace.info:
+            self.trace.record(FIN, -1, self.count, now - self.startTime, now)
+        self.packets.close()
+        return self.stats(now - self.startTime)
+
+    def run(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udpSocket:
+            self.socket = udpSocket
+            udpSocket.setblocking(False)
+
+            if self.resume:
+                self.skip_delivered(self.request_resume())
+
+            self.start(time.time())
+            while not self.done:
+                self.send_window(time.time())
+                self.flush()
+
+                # sleep only until the next retransmit or pacer token is due
+                received, _, _ = select.select([udpSocket], [], [], self.wait_time(time.time()))
+                if received:
+                    self.handle_acks(self.receive_acks(), time.time())
+
+                self.handle_timeouts(time.time())
+
+            return self.finish(time.time())
+
+    def stats(self, useTime):
+        delays = self.delays
+        # bytes kept from an earlier run were not sent this time
+        totalData = self.packets.size - self.resumedBytes
+        throughput = totalData / useTime if useTime > 0 else 0
+        avgDelay = delays.mean
+        avgJitter = delays.jitter
+        metric = (
+            0.2 * (throughput / 2000)
+            + 0.1 * (1 / avgJitter if avgJitter > 0 else 0)
+            + 0.8 * (1 / avgDelay if avgDelay > 0 else 0)
+        )
+        return {
+            "algorithm": self.controller.name,
+            "packets": self.count,
+            "payload": self.messageSize,
+            "retransmissions": self.totalRetransmission,
+            "resumedBytes": self.resumedBytes,
+            "time": useTime,
+            "throughput": throughput,
+            "avgDelay": avgDelay,
+            "avgJitter": avgJitter,
+            "delayStddev": delays.stddev,
+            "delayP50": delays.percentile(50),
+            "delayP95": delays.percentile(95),
+            "delayP99": delays.percentile(99),
+            "metric": metric,
+            "ackBatches": self.ackBatches,
+            "ackBatchMean": self.ackBatchTotal / self.ackBatches if self.ackBatches else 0,
+            "ackBatchMax": self.ackBatchMax,
+            "sends": self.sends,
+            "fecParity": self.fec.paritySent if self.fec else 0,
+            "fecLossRate": self.fec.lossRate if self.fec else 0,
+        }
+
+
+# a script constant, or its override as a json value (30, 0.5, null)
+def tunable(name, default):
+    value = os.environ.get(TUNABLE_PREFIX + name)
+    return default if value is None else json.loads(value)
+
+
+# largest payload the route takes without ip fragmentation (linux)
+def path_mtu_payload(address, headerSize=SEQ_ID_SIZE):
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.connect(address)
+            probe.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
+            mtu = probe.getsockopt(socket.IPPROTO_IP, IP_MTU)
+    except OSError:
+        return MESSAGE_SIZE
+    return min(mtu, MAX_DATAGRAM + IP_UDP_HEADERS) - IP_UDP_HEADERS - headerSize
+
+
+# send a control request until parse(reply) gives an answer, None if
+# the receiver never does. only for receivers that know the request,
+# an old one would store it as data
+def control_request(address, request, parse, timeout=NEGOTIATE_TIMEOUT, attempts=NEGOTIATE_ATTEMPTS):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as control:
+        control.settimeout(timeout)
+        for _ in range(attempts):
+            control.sendto(request, address)
+            try:
+                reply, _ = control.recvfrom(PACKET_SIZE)
+            except socket.timeout:
+                continue
+            answer = parse(reply)
+            if answer:
+                return answer
+    return None
+
+
+# ask the receiver for a payload size, it answers with what it accepts
+def negotiate_payload(address, wanted):
+    accepted = control_request(address, pack_size_request(wanted), unpack_size_reply)
+    return MESSAGE_SIZE if accepted is None else min(wanted, accepted)
+
+
+# highest header version both sides read, 1 (4 byte offsets) without an answer
+def negotiate_version(address, wanted=WIDE_VERSION):
+    agreed = control_request(address, pack_version_request(wanted), unpack_version_reply)
+    return LEGACY_VERSION if agreed is None else min(wanted, agreed)
+
+
+# size and a hash of the size and both ends of the file, cheap even for
+# big files and enough to tell an edited or different file apart
+def file_id(path):
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest.update(size.to_bytes(8, "big"))
+        digest.update(f.read(FILE_ID_SAMPLE))
+        f.seek(max(0, size - FILE_ID_SAMPLE))
+        digest.update(f.read(FILE_ID_SAMPLE))
+    return digest.digest()
+
+
+# --payload: a byte count, or "mtu" for the path mtu
+def choose_payload(address, payload, headerSize=SEQ_ID_SIZE):
+    wanted = path_mtu_payload(address, headerSize) if payload == "mtu" else int(payload)
+    return negotiate_payload(address, wanted)
+
+
+# --fec: packets per parity block, 0 for none
+def fec_block(value):
+    k = int(value)
+    if k and not 1 <= k <= FEC_MAX_BLOCK:
+        raise argparse.ArgumentTypeError(f"fec block must be 1 to {FEC_MAX_BLOCK} packets, or 0 for no fec")
+    return k
+
+
+# 8 byte offsets only for a file over 2 GiB, the one case 4 bytes cannot
+# address: an older receiver writes a version request it does not know
+# to disk, so smaller files never send one. exits when it does not agree
+def choose_wide(address, path):
+    if os.path.getsize(path) <= MAX_SEQ_OFFSET:
+        return False
+    if negotiate_version(address) < WIDE_VERSION:
+        sys.exit(f"{path} is over 2 GiB and the receiver at {address[0]}:{address[1]} does not take 8 byte offsets")
+    return True
+
+
+def print_metrics(stats):
+    print("\n=========== METRIC ==================")
+    print(f"Packets sent: {stats['packets']} ({stats['payload']} byte payloads)")
+    print(f"Packet retransmissions: {stats['retransmissions']}")
+    if stats["resumedBytes"]:
+        print(f"Resumed: {stats['resumedBytes']} bytes already at the receiver, not sent")
+    if stats["fecParity"]:
+        print(f"FEC parity packets: {stats['fecParity']} (loss estimate {stats['fecLossRate']:.1%})")
+    print(f"Send calls: {stats['sends']}")
+    print(f"ACK batches: {stats['ackBatches']} (mean {stats['ackBatchMean']:.2f}, max {stats['ackBatchMax']} acks)")
+    print(f"Time: {stats['time']:.7f} seconds\n")
+    print(f"Throughput: {stats['throughput']:.7f} bytes/second")
+    print(f"Average delay: {stats['avgDelay']:.7f} seconds")
+    print(f"Average jitter: {stats['avgJitter']:.7f} seconds")
+    print(f"Delay p50/p95/p99: {stats['delayP50']:.7f} / {stats['delayP95']:.7f} / {stats['delayP99']:.7f} seconds")
+    print(f"Metric: {stats['metric']:.7f}")
+
+
+# shared command line for the sender scripts
+def run_sender(controller, **options):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=FILE_PATH, help="file to send")
+    parser.add_argument("--host", default=SERVER_ADDRESS[0], help="receiver address")
+    parser.add_argument("--port", type=int, default=SERVER_ADDRESS[1], help="receiver port")
+    parser.add_argument("--verbose", action="store_true", help="print every packet and ack")
+    parser.add_argument("--pace", action="store_true", help="spread each window over the rtt instead of bursting it")
+    parser.add_argument("--payload", help="negotiate a payload size with the receiver, bytes or 'mtu'")
+    parser.add_argument("--fec", type=fec_block, default=0, help="send parity after every N packets, 0 for no fec")
+    parser.add_argument("--resume", action="store_true", help="skip what the receiver kept of this file from an earlier run")
+    parser.add_argument("--no-gso", action="store_true", help="one send call per datagram, no udp segmentation offload")
+    parser.add_argument("--stats-json", help="also write the final stats to this file, for benchmark.py")
+    add_trace_arguments(parser, TRACE_PATH)
+    args = parser.parse_args()
+
+    if args.pace:
+        options["pacing"] = True
+    if args.fec:
+        options["fec"] = args.fec
+    if args.no_gso:
+        options["gso"] = False
+    if args.resume:
+        options["resume"] = True
+    options["wide"] = choose_wide((args.host, args.port), args.file)
+    if args.payload:
+        options["messageSize"] = choose_payload((args.host, args.port), args.payload, header_size(options["wide"]))
+    transport = Transport(controller, args.file, (args.host, args.port), verbose=args.verbose, trace=tracer_from_args(args), **options)
+    print(f"Total packets to send: {transport.count}")
+    stats = transport.run()
+    print_metrics(stats)
+    if args.stats_json:
+        with open(args.stats_json, "w") as f:
+            json.dump(stats, f)
+    return stats
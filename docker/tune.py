@@ -0,0 +1,123 @@
+import argparse
+import json
+import math
+import random
+import tempfile
+
+from benchmark import BASE_PORT, PROFILES, RUN_TIMEOUT, run_once
+
+# parameter tuner ====================================================
+# successive halving over a sender's constants: sample configurations,
+# run each on a few seeds, keep the best 1/eta by mean metric, give the
+# survivors eta times more seeds, repeat until one is left. earlier
+# seeds are kept, so every rung only pays for the new runs. the script's
+# own constants always enter as one candidate, so the result is never
+# worse than what is checked in on the runs measured. overrides reach
+# the sender through transport.tunable.
+
+# (low, high, type), floats are sampled on a log scale
+SPACE = {
+    "WINDOW_SIZE": (2, 100, int),
+    "TIMEOUT": (0.2, 3.0, float),
+    "INITIAL_CWND": (1, 20, int),
+    "INITIAL_SSTHRESH": (2, 256, int),
+    "MAX_WINDOW_SIZE": (5, 200, int),
+}
+
+# constants each sender reads
+PARAMETERS = {
+    "stop-and-wait": ("TIMEOUT",),
+    "fixed": ("WINDOW_SIZE", "TIMEOUT"),
+    "tahoe": ("INITIAL_CWND", "INITIAL_SSTHRESH", "MAX_WINDOW_SIZE", "TIMEOUT"),
+    "reno": ("INITIAL_CWND", "INITIAL_SSTHRESH", "MAX_WINDOW_SIZE", "TIMEOUT"),
+    "t": ("WINDOW_SIZE", "TIMEOUT"),
+    "r": ("WINDOW_SIZE", "TIMEOUT"),
+    "custom": ("WINDOW_SIZE", "TIMEOUT"),
+    "cubic": ("INITIAL_CWND", "INITIAL_SSTHRESH", "MAX_WINDOW_SIZE", "TIMEOUT"),
+    "bbr": ("INITIAL_CWND", "TIMEOUT"),
+}
+
+CONFIGS = 16
+ETA = 2
+MIN_SEEDS = 1
+
+
+def sample(rng, names):
+    config = {}
+    for name in names:
+        low, high, kind = SPACE[name]
+        if kind is int:
+            config[name] = rng.randint(low, high)
+        else:
+            config[name] = round(math.exp(rng.uniform(math.log(low), math.log(high))), 3)
+    return config
+
+
+class Tuner:
+    def __init__(self, sender, size, profile, args):
+        self.sender = sender
+        self.size = size
+        self.profile = profile
+        self.args = args
+        self.trials = []  # every run, in order
+
+    def evaluate(self, candidate, seeds, workdir):
+        for seed in range(len(candidate["metrics"]) + 1, seeds + 1):
+            row = run_once(self.sender, self.size, self.profile, seed, self.args, workdir, candidate["config"])
+            passed = row["ok"] and row["verified"]
+
+            # a failed transfer scores zero, never a tuning win
+            metric = row.get("metric", 0) if passed else 0
+            candidate["metrics"].append(metric)
+            self.trials.append({"config": candidate["config"], "seed": seed, "passed": passed, "metric": metric,
+                                "time": row.get("time"), "error": row["error"]})
+            print(f"  {candidate['config'] or 'defaults'} seed {seed}: metric {metric:.3f}" + ("" if passed else f" FAILED {row['error']}"))
+        candidate["mean"] = sum(candidate["metrics"]) / len(candidate["metrics"])
+
+    def run(self, configs, eta, minSeeds, seed):
+        rng = random.Random(seed)
+        candidates = [{"config": {}, "metrics": []}]
+        candidates += [{"config": sample(rng, PARAMETERS[self.sender]), "metrics": []} for _ in range(configs - 1)]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            seeds = minSeeds
+            rung = 0
+            while True:
+                print(f"rung {rung}: {len(candidates)} configurations x {seeds} seeds")
+                for candidate in candidates:
+                    self.evaluate(candidate, seeds, workdir)
+                candidates.sort(key=lambda candidate: candidate["mean"], reverse=True)
+                if len(candidates) == 1:
+                    return candidates[0]
+                candidates = candidates[: max(1, len(candidates) // eta)]
+                seeds *= eta
+                rung += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sender", choices=list(PARAMETERS), help="sender to tune")
+    parser.add_argument("--size", type=int, default=100000, help="file size in bytes")
+    parser.add_argument("--profile", choices=list(PROFILES), default="lossy", help="benchmark.py network profile")
+    parser.add_argument("--configs", type=int, default=CONFIGS, help="configurations in the first rung, including the defaults")
+    parser.add_argument("--eta", type=int, default=ETA, help="keep 1/eta per rung, survivors get eta times the seeds")
+    parser.add_argument("--min-seeds", type=int, default=MIN_SEEDS, help="seeds per configuration in the first rung")
+    parser.add_argument("--seed", type=int, default=1, help="seed for sampling configurations")
+    parser.add_argument("--port", type=int, default=BASE_PORT)
+    parser.add_argument("--timeout", type=float, default=RUN_TIMEOUT, help="seconds before a run is abandoned")
+    parser.add_argument("--log", help="write every trial and the result here as json")
+    args = parser.parse_args()
+
+    tuner = Tuner(args.sender, args.size, args.profile, args)
+    best = tuner.run(args.configs, args.eta, args.min_seeds, args.seed)
+
+    print(f"\nbest for {args.sender} on {args.profile}: {best['config'] or 'the defaults'}, "
+          f"mean metric {best['mean']:.3f} over {len(best['metrics'])} seeds")
+    for name, value in best["config"].items():
+        print(f"{name} = {value}")
+
+    if args.log:
+        with open(args.log, "w") as f:
+            json.dump({"sender": args.sender, "size": args.size, "profile": args.profile,
+                       "best": {"config": best["config"], "mean": best["mean"], "metrics": best["metrics"]},
+                       "trials": tuner.trials}, f, indent=2)